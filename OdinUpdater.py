@@ -4,6 +4,2136 @@ import os
 import subprocess
 import threading
 import re
+import json
+import hashlib
+import shutil
+import signal
+import zlib
+import time
+import zipfile
+import tempfile
+import codecs
+import collections
+import logging
+import logging.handlers
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# full: complete clone and all tags, blobless: file contents fetched on demand, shallow: only the commits that are built
+GIT_FETCH_MODES = ('full', 'blobless', 'shallow')
+DEV_TAG_PATTERN = re.compile(r'^dev-(\d{4})-(\d{2})$')
+DEV_TAG_REFSPEC = "+refs/tags/dev-*:refs/tags/dev-*"
+# First downloads fetch the dev tags in steps of this many tags, so an interrupted clone resumes from the last step
+CLONE_CHECKPOINT_TAGS = 6
+# Left in the git folder until a clone has finished, the next update resumes the clone instead of pulling
+INCOMPLETE_CLONE_MARKER = "odin-updater-incomplete-clone"
+# git output of failures in the transport, only these are retried (not merge conflicts, local changes, missing refs)
+TRANSIENT_GIT_ERROR_PATTERN = re.compile(
+    r"could not resolve host|unable to access|could not read from remote repository|connection (?:timed out|reset|refused|closed)"
+    r"|operation timed out|timed out after|early eof|rpc failed|remote end hung up|unexpected disconnect|ssl[ _]|gnutls|tls connection"
+    r"|the requested url returned error: (?:5\d\d|429)|temporary failure|network is unreachable|broken pipe",
+    re.IGNORECASE
+)
+
+# Commands are run through cmd.exe on Windows (needed for .bat files), directly everywhere else
+USE_SHELL = os.name == 'nt'
+
+def sorted_dev_tags(tags):
+    """Tags matching dev-YYYY-MM from a list of tag names, oldest first"""
+    dev_tags = []
+
+    for tag in tags:
+        tag = tag.strip()
+        if not tag:  # Skip empty lines
+            continue
+        match = DEV_TAG_PATTERN.match(tag)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+            dev_tags.append((tag, year, month))
+
+    # Sort by year, then month
+    dev_tags.sort(key=lambda x: (x[1], x[2]))
+    return [tag for tag, year, month in dev_tags]
+
+def latest_dev_tag(tags):
+    """Pick the newest tag matching dev-YYYY-MM from a list of tag names"""
+    dev_tags = sorted_dev_tags(tags)
+    return dev_tags[-1] if dev_tags else None
+
+def get_data_path(*parts):
+    """Path inside the persistent data folder of Odin Updater (Packages/User/OdinUpdater)"""
+    data_folder = os.path.join(sublime.packages_path(), 'User', 'OdinUpdater')
+    os.makedirs(data_folder, exist_ok=True)
+    return os.path.join(data_folder, *parts)
+
+SETTINGS_FILE = 'OdinUpdater.sublime-settings'
+PLATFORM_SETTINGS_FILES = {
+    'windows': 'OdinUpdater (Windows).sublime-settings',
+    'osx': 'OdinUpdater (OSX).sublime-settings',
+    'linux': 'OdinUpdater (Linux).sublime-settings',
+}
+
+def default_install_folder(name):
+    """Install folder suggested in the generated user settings, the package defaults are Windows paths"""
+    if sublime.platform() == 'windows':
+        return f"C:\\{name}"
+    return f"~/{name}"
+
+# Settings holding a file or folder, they are normalized for the platform in the snapshot
+PATH_SETTINGS = ('odin_folder', 'ols_folder', 'git_mirror_folder', 'bundle_folder', 'llvm_config', 'toolchain_setup_script')
+PATH_LIST_SETTINGS = ('compiler_benchmark_projects',)
+
+def normalize_path(path):
+    """~ expanded and separators of the platform, anything that isn't a non-empty string is returned as it is"""
+    if not path or not isinstance(path, str):
+        return path
+    return os.path.normpath(os.path.expanduser(path))
+
+class SettingsSnapshot:
+    """
+    Immutable, resolved Odin Updater settings. Values that don't have the type of the caller's default
+    (a string where a number is expected) are reported once and replaced by the default.
+    """
+    def __init__(self, values):
+        self._values = dict(values)
+        self._reported = set()
+
+    def get(self, key, default=None):
+        value = self._values.get(key)
+        if value is None:
+            return default
+        if default is not None and not self._same_type(value, default):
+            if key not in self._reported:
+                self._reported.add(key)
+                print(f"[Odin Update] Setting '{key}' should be a {type(default).__name__}, using {default!r}")
+            return default
+        return value
+
+    @staticmethod
+    def _same_type(value, default):
+        if isinstance(default, bool) or isinstance(value, bool):
+            return isinstance(value, bool) and isinstance(default, bool)
+        if isinstance(default, (int, float)):
+            return isinstance(value, (int, float))
+        return isinstance(value, type(default))
+
+class SettingsService:
+    """
+    Resolves OdinUpdater.sublime-settings (package defaults and the user file, merged by Sublime) and the
+    platform file on top of it into one SettingsSnapshot that every command, the prefetcher and the benchmarks
+    share. add_on_change listeners on both files drop the snapshot, the next access resolves it again.
+    """
+    LISTENER_KEY = "odin_updater_settings"
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._snapshot = None
+        self._watched = []
+
+    def snapshot(self):
+        with self.lock:
+            if self._snapshot is None:
+                self._snapshot = self._resolve()
+            return self._snapshot
+
+    def get(self, key, default=None):
+        return self.snapshot().get(key, default)
+
+    def invalidate(self):
+        with self.lock:
+            self._snapshot = None
+
+    def clear(self):
+        """Removes the change listeners, when the plugin is unloaded"""
+        with self.lock:
+            for layer in self._watched:
+                layer.clear_on_change(self.LISTENER_KEY)
+            self._watched = []
+            self._snapshot = None
+
+    def _resolve(self):
+        layers = [
+            sublime.load_settings(SETTINGS_FILE),
+            sublime.load_settings(PLATFORM_SETTINGS_FILES.get(sublime.platform(), PLATFORM_SETTINGS_FILES['linux']))
+        ]
+        if not self._watched:
+            for layer in layers:
+                layer.add_on_change(self.LISTENER_KEY, self.invalidate)
+            self._watched = layers
+        
+        values = {}
+        for layer in layers:
+            values.update(layer.to_dict() if hasattr(layer, 'to_dict') else dict(layer))
+        for key in PATH_SETTINGS:
+            if key in values:
+                values[key] = normalize_path(values[key])
+        for key in PATH_LIST_SETTINGS:
+            if isinstance(values.get(key), list):
+                values[key] = [normalize_path(path) for path in values[key]]
+        return SettingsSnapshot(values)
+
+odin_settings = SettingsService()
+
+def mirror_path(mirror_folder, repo_url):
+    """Bare mirror of repo_url inside mirror_folder, one per URL"""
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', repo_url.rstrip('/').split('/')[-1])
+    if name.endswith(".git"):
+        name = name[:-4]
+    digest = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()[:10]
+    return os.path.join(mirror_folder, f"{name}-{digest}.git")
+
+def file_sha256(path):
+    """sha256 hex digest of a file, None if it does not exist"""
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BuildFingerprintStore:
+    """
+    Persisted fingerprint per component (odin, ols) describing what the current binary was built from.
+
+    A fingerprint is a dict with the resolved commit, tag, compiler version and the sha256 of the produced binary.
+    The OLS fingerprint also records the Odin commit of its compiler, and `compilers` maps verified Odin commits to
+    their odin_build_version so the compiler an OLS build needs is known before Odin is built.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, component):
+        with self.lock:
+            return self._load().get(component)
+
+    def _save(self, data):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def set(self, component, fingerprint):
+        with self.lock:
+            data = self._load()
+            data[component] = fingerprint
+            self._save(data)
+
+    def compiler_version(self, odin_commit):
+        """odin_build_version the Odin commit produced when it was last verified, None if it never was"""
+        with self.lock:
+            return self._load().get('compilers', {}).get(odin_commit)
+
+    def record_compiler(self, odin_commit, version, limit=50):
+        with self.lock:
+            data = self._load()
+            compilers = data.get('compilers', {})
+            compilers.pop(odin_commit, None)
+            compilers[odin_commit] = version
+            data['compilers'] = dict(list(compilers.items())[-limit:])
+            self._save(data)
+
+    def matches(self, component, commit, tag, compiler, binary_path):
+        """True if the stored fingerprint matches the sources and the binary on disk is the one that was recorded"""
+        stored = self.get(component)
+        if not stored or not commit:
+            return False
+        if (stored.get('commit'), stored.get('tag'), stored.get('compiler')) != (commit, tag, compiler):
+            return False
+        return stored.get('binary_hash') is not None and stored.get('binary_hash') == file_sha256(binary_path)
+
+class RetryPolicy:
+    """
+    Retries for network steps (clone, fetch, pull). The delay doubles after every failed attempt up to
+    max_delay, waiting ends early when the update is cancelled. None and False count as failures.
+    """
+    def __init__(self, retries=3, delay=5, max_delay=60):
+        self.retries = max(0, retries)
+        self.delay = delay
+        self.max_delay = max_delay
+
+    def delays(self):
+        return [min(self.delay * (2 ** attempt), self.max_delay) for attempt in range(self.retries)]
+
+    def run(self, action, description, log=print, cancel_event=None, retryable=None):
+        """retryable is asked after a failure whether it is worth another attempt"""
+        result = action()
+        for attempt, delay in enumerate(self.delays(), 1):
+            if result is not None and result is not False:
+                break
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if retryable is not None and not retryable():
+                break
+            log(f"{description} failed, retrying in {delay}s (retry {attempt}/{self.retries})")
+            if cancel_event is not None and cancel_event.wait(delay):
+                break
+            if cancel_event is None:
+                time.sleep(delay)
+            result = action()
+        return result
+
+class UpdateScheduler:
+    """
+    Runs update stages as a dependency graph on a small worker pool.
+
+    A stage starts as soon as all of its dependencies have succeeded. When a stage
+    fails (returns False or raises) every stage depending on it is skipped. Once the
+    optional cancel_event is set no new stages are started.
+    """
+    def __init__(self, max_workers=3, log=print, cancel_event=None):
+        self.max_workers = max(1, int(max_workers))
+        self.log = log
+        self.cancel_event = cancel_event
+        self.stages = {}
+        self.order = []
+        self.times = {}
+
+    def add(self, name, func, deps=()):
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already added")
+        for dep in deps:
+            if dep not in self.stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self.stages[name] = (func, tuple(deps))
+        self.order.append(name)
+
+    def run(self):
+        """Run all stages, returns a dict of stage name -> 'ok', 'failed' or 'skipped'"""
+        results = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while len(results) < len(self.order):
+                for name in self.order:
+                    if name in results or name in running.values():
+                        continue
+                    func, deps = self.stages[name]
+                    if self.cancel_event is not None and self.cancel_event.is_set():
+                        self.log(f"Skipping stage '{name}' (cancelled)")
+                        results[name] = 'skipped'
+                    elif any(results.get(dep) in ('failed', 'skipped') for dep in deps):
+                        self.log(f"Skipping stage '{name}' (dependency failed)")
+                        results[name] = 'skipped'
+                    elif all(results.get(dep) == 'ok' for dep in deps):
+                        running[executor.submit(self._run_stage, name, func)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        ok = future.result()
+                    except Exception as e:
+                        self.log(f"ERROR: stage '{name}' raised: {str(e)}")
+                        ok = False
+                    results[name] = 'ok' if ok else 'failed'
+
+        return results
+
+    def _run_stage(self, name, func):
+        start = time.time()
+        try:
+            return func()
+        finally:
+            self.times[name] = (start, time.time())
+
+    def first_failure(self, results):
+        for name in self.order:
+            if results.get(name) == 'failed':
+                return name
+        return None
+
+class GitMetadataError(Exception):
+    """Raised by GitMetadataReader when the repository has to be queried through the git CLI instead"""
+    pass
+
+class GitMetadataReader:
+    """
+    Read-only access to refs, HEAD and commits straight from the .git directory, without spawning git.
+
+    Only loose refs, packed-refs and loose (zlib compressed) commit objects are understood. Anything else,
+    such as commits that only exist inside a pack file, raises GitMetadataError so the caller can fall back
+    to the git CLI.
+    """
+    AUTHOR_PATTERN = re.compile(r'^author (.*) <[^>]*> (\d+) ([+-])(\d{2})(\d{2})$')
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.git_dir = self._resolve_git_dir(folder)
+        self.common_dir = self._resolve_common_dir(self.git_dir)
+
+    def _resolve_git_dir(self, folder):
+        git_path = os.path.join(folder, ".git")
+        if os.path.isdir(git_path):
+            return git_path
+        if os.path.isfile(git_path):
+            # Worktrees and submodules use a .git file pointing to the real git dir
+            with open(git_path, 'r') as f:
+                content = f.read().strip()
+            if content.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(folder, content[len("gitdir:"):].strip()))
+        raise GitMetadataError(f"{folder} is not a git repository")
+
+    def _resolve_common_dir(self, git_dir):
+        commondir_path = os.path.join(git_dir, "commondir")
+        if os.path.isfile(commondir_path):
+            with open(commondir_path, 'r') as f:
+                return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+        return git_dir
+
+    def _packed_refs(self):
+        refs = {}
+        try:
+            with open(os.path.join(self.common_dir, "packed-refs"), 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith('#') or line.startswith('^'):
+                        continue
+                    sha, name = line.split(' ', 1)
+                    refs[name] = sha
+        except FileNotFoundError:
+            pass
+        return refs
+
+    def resolve_ref(self, name, depth=0):
+        """Resolve a full ref name (refs/heads/master) or HEAD to a commit sha"""
+        if depth > 5:
+            raise GitMetadataError(f"Too many symbolic ref levels for {name}")
+
+        base_dir = self.git_dir if name == "HEAD" else self.common_dir
+        ref_path = os.path.join(base_dir, *name.split('/'))
+        if os.path.isfile(ref_path):
+            with open(ref_path, 'r') as f:
+                content = f.read().strip()
+            if content.startswith("ref:"):
+                return self.resolve_ref(content[len("ref:"):].strip(), depth + 1)
+            return content
+
+        sha = self._packed_refs().get(name)
+        if sha is None:
+            raise GitMetadataError(f"Could not resolve ref {name}")
+        return sha
+
+    def current_branch(self):
+        """Name of the checked out branch, empty string for a detached HEAD (same as `git branch --show-current`)"""
+        with open(os.path.join(self.git_dir, "HEAD"), 'r') as f:
+            content = f.read().strip()
+        if content.startswith("ref: refs/heads/"):
+            return content[len("ref: refs/heads/"):]
+        return ""
+
+    def head(self):
+        return self.resolve_ref("HEAD")
+
+    def tags(self):
+        """All tag names from loose refs and packed-refs"""
+        names = set(name[len("refs/tags/"):] for name in self._packed_refs() if name.startswith("refs/tags/"))
+        tags_dir = os.path.join(self.common_dir, "refs", "tags")
+        for root, _, files in os.walk(tags_dir):
+            for file_name in files:
+                rel_path = os.path.relpath(os.path.join(root, file_name), tags_dir)
+                names.add(rel_path.replace(os.sep, '/'))
+        return sorted(names)
+
+    def read_commit(self, sha):
+        """Parse a loose commit object, returns dict with hash, author, date (iso) and subject"""
+        object_path = os.path.join(self.common_dir, "objects", sha[:2], sha[2:])
+        if not os.path.isfile(object_path):
+            raise GitMetadataError(f"Commit {sha} is not a loose object")
+
+        with open(object_path, 'rb') as f:
+            raw = zlib.decompress(f.read())
+
+        header, _, body = raw.partition(b'\0')
+        if not header.startswith(b'commit '):
+            raise GitMetadataError(f"Object {sha} is not a commit")
+
+        text = body.decode('utf-8', errors='replace')
+        headers, _, message = text.partition('\n\n')
+        for line in headers.split('\n'):
+            match = self.AUTHOR_PATTERN.match(line)
+            if match:
+                name, timestamp, sign, hours, minutes = match.groups()
+                offset = timedelta(hours=int(hours), minutes=int(minutes))
+                tz = timezone(-offset if sign == '-' else offset)
+                date = datetime.fromtimestamp(int(timestamp), tz).strftime("%Y-%m-%d %H:%M:%S ") + f"{sign}{hours}{minutes}"
+                return {
+                    'hash': sha[:7],
+                    'author': name,
+                    'date': date,
+                    'subject': message.strip().split('\n')[0] if message.strip() else "",
+                }
+
+        raise GitMetadataError(f"Commit {sha} has no author")
+
+class ArtifactStore:
+    """
+    Content-addressed cache of built binaries so any earlier build can be made active again without compiling.
+
+    Binaries are stored once per sha256 in blobs/, index.json maps component + commit + toolchain to a blob.
+    The least recently used entries are evicted when max_count or max_bytes is exceeded.
+    """
+    def __init__(self, folder, max_count=10, max_bytes=512 * 1024 * 1024):
+        self.folder = folder
+        self.blobs_folder = os.path.join(folder, "blobs")
+        self.index_path = os.path.join(folder, "index.json")
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.blobs_folder, exist_ok=True)
+
+    def _key(self, component, commit, toolchain):
+        return f"{component}/{commit}/{toolchain or ''}"
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, index):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, self.index_path)
+
+    def entries(self):
+        """All cached builds, most recently used first"""
+        with self.lock:
+            index = self._load()
+        return sorted(index.values(), key=lambda e: e['last_used'], reverse=True)
+
+    def find(self, component, commit, toolchain):
+        with self.lock:
+            entry = self._load().get(self._key(component, commit, toolchain))
+        if entry and os.path.isfile(os.path.join(self.blobs_folder, entry['blob'])):
+            return entry
+        return None
+
+    def add(self, component, commit, tag, toolchain, binary_path):
+        """Store a built binary, returns the new entry"""
+        blob = file_sha256(binary_path)
+        if blob is None:
+            return None
+
+        with self.lock:
+            blob_path = os.path.join(self.blobs_folder, blob)
+            if not os.path.exists(blob_path):
+                shutil.copy2(binary_path, blob_path + ".tmp")
+                os.replace(blob_path + ".tmp", blob_path)
+
+            index = self._load()
+            entry = {
+                'component': component,
+                'commit': commit,
+                'tag': tag,
+                'toolchain': toolchain,
+                'binary_name': os.path.basename(binary_path),
+                'blob': blob,
+                'size': os.path.getsize(blob_path),
+                'created': time.time(),
+                'last_used': time.time(),
+            }
+            index[self._key(component, commit, toolchain)] = entry
+            self._evict(index)
+            self._save(index)
+            return entry
+
+    def activate(self, entry, dest_path):
+        """Copy a cached binary over dest_path and mark the entry as used"""
+        with self.lock:
+            install_file(os.path.join(self.blobs_folder, entry['blob']), dest_path)
+            index = self._load()
+            key = self._key(entry['component'], entry['commit'], entry['toolchain'])
+            if key in index:
+                index[key]['last_used'] = time.time()
+                self._save(index)
+
+    def _evict(self, index):
+        by_age = sorted(index.items(), key=lambda item: item[1]['last_used'])
+        total_bytes = sum(entry['size'] for entry in index.values())
+        while by_age and (len(index) > self.max_count or total_bytes > self.max_bytes):
+            key, entry = by_age.pop(0)
+            del index[key]
+            total_bytes -= entry['size']
+
+        # Blobs can be shared between entries, only remove the ones nothing points to anymore
+        used_blobs = set(entry['blob'] for entry in index.values())
+        for blob in os.listdir(self.blobs_folder):
+            if blob not in used_blobs:
+                try:
+                    os.remove(os.path.join(self.blobs_folder, blob))
+                except OSError:
+                    pass
+
+def open_artifact_store(settings=odin_settings):
+    """ArtifactStore with the artifact_cache_max_count/artifact_cache_max_mb limits, None when caching is turned off"""
+    max_count = settings.get('artifact_cache_max_count', 10)
+    if max_count <= 0:
+        return None
+    return ArtifactStore(get_data_path('artifacts'), max_count=max_count, max_bytes=settings.get('artifact_cache_max_mb', 512) * 1024 * 1024)
+
+def install_file(src_path, dest_path):
+    """Replace dest_path with a copy of src_path, works even if dest_path is a running executable on Windows"""
+    new_path = dest_path + ".new"
+    shutil.copy2(src_path, new_path)
+    try:
+        os.replace(new_path, dest_path)
+    except PermissionError:
+        # A running exe can't be overwritten on Windows but it can be renamed out of the way
+        old_path = dest_path + ".old"
+        if os.path.exists(old_path):
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        os.replace(dest_path, old_path)
+        os.replace(new_path, dest_path)
+
+class BundleError(Exception):
+    pass
+
+BUNDLE_FORMAT = 1
+ODIN_BUNDLE_FOLDERS = ('base', 'core', 'vendor')
+OLS_BUNDLE_FOLDERS = ('builtin',)
+
+def bundle_platform():
+    return f"{sublime.platform()}-{sublime.arch()}"
+
+def bundle_files(folder, files, subfolders):
+    """Paths relative to folder of the given files and everything below subfolders, '/' separated"""
+    paths = [name for name in files if os.path.isfile(os.path.join(folder, name))]
+    for subfolder in subfolders:
+        for root, dirs, names in os.walk(os.path.join(folder, subfolder)):
+            dirs.sort()
+            for name in sorted(names):
+                paths.append(os.path.relpath(os.path.join(root, name), folder).replace(os.sep, '/'))
+    return paths
+
+class ToolchainBundle:
+    """
+    Zip archive of a verified Odin (and optionally OLS) installation, so one machine can build for the team.
+
+    manifest.json holds the tag, commits, build_info and the sha256 of every file. Installing checks each
+    file against the manifest, extracts next to the live folder and then swaps the top level entries in.
+    """
+    MANIFEST = "manifest.json"
+    # Written into every folder a bundle is installed to, updates from source replace such folders with a clone
+    INSTALL_MARKER = ".odin-bundle.json"
+
+    def __init__(self, path):
+        self.path = path
+
+    def read_manifest(self):
+        with zipfile.ZipFile(self.path) as archive:
+            try:
+                manifest = json.loads(archive.read(self.MANIFEST).decode('utf-8'))
+            except KeyError:
+                raise BundleError(f"{self.path} is not an Odin bundle (no {self.MANIFEST})")
+        if manifest.get('format') != BUNDLE_FORMAT:
+            raise BundleError(f"Unsupported bundle format {manifest.get('format')}")
+        return manifest
+
+    def write(self, build_info, components):
+        """components maps odin/ols to dicts with commit, tag, compiler, folder and files"""
+        manifest = {
+            'format': BUNDLE_FORMAT,
+            'platform': bundle_platform(),
+            'created': time.time(),
+            'build_info': build_info,
+            'components': {},
+        }
+        tmp_path = self.path + ".tmp"
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for component, info in components.items():
+                hashes = {}
+                for path in info['files']:
+                    source = os.path.join(info['folder'], path)
+                    archive.write(source, f"{component}/{path}")
+                    hashes[path] = file_sha256(source)
+                manifest['components'][component] = {
+                    'commit': info['commit'],
+                    'tag': info['tag'],
+                    'compiler': info['compiler'],
+                    'binary_name': info['binary_name'],
+                    'binary_hash': hashes.get(info['binary_name']),
+                    'files': hashes,
+                }
+            archive.writestr(self.MANIFEST, json.dumps(manifest, indent=4))
+        os.replace(tmp_path, self.path)
+        return manifest
+
+    @staticmethod
+    def check_target(folder):
+        """Bundles are not installed over a git checkout, git would see every file as a local change"""
+        if os.path.exists(os.path.join(folder, ".git")):
+            raise BundleError(f"{folder} is a git checkout that is updated from source. Point the folder setting to another folder to install the bundle there.")
+
+    def install(self, component, folder):
+        """Install one component into folder, nothing in folder is touched until all files passed the hash check"""
+        self.check_target(folder)
+        manifest = self.read_manifest()
+        info = manifest['components'][component]
+        staging = os.path.normpath(folder) + ".bundle"
+        if os.path.exists(staging):
+            shutil.rmtree(staging)
+        try:
+            self._extract(info['files'], component, staging)
+            if not os.path.exists(folder):
+                os.rename(staging, folder)
+            else:
+                for name in os.listdir(staging):
+                    source = os.path.join(staging, name)
+                    dest = os.path.join(folder, name)
+                    if os.path.isfile(source):
+                        install_file(source, dest)
+                        continue
+                    previous = dest + ".previous"
+                    if os.path.exists(previous):
+                        shutil.rmtree(previous)
+                    if os.path.exists(dest):
+                        os.rename(dest, previous)
+                    os.rename(source, dest)
+                    shutil.rmtree(previous, ignore_errors=True)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        
+        with open(os.path.join(folder, self.INSTALL_MARKER), 'w') as f:
+            json.dump({'bundle': self.path, 'commit': info['commit'], 'tag': info['tag'], 'installed': time.time()}, f, indent=4)
+
+    def _extract(self, files, component, dest_folder):
+        with zipfile.ZipFile(self.path) as archive:
+            for path, expected_hash in files.items():
+                parts = path.split('/')
+                if path.startswith('/') or '..' in parts or ':' in parts[0]:
+                    raise BundleError(f"Unsafe path in bundle: {path}")
+                
+                dest = os.path.join(dest_folder, *parts)
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                digest = hashlib.sha256()
+                member = archive.getinfo(f"{component}/{path}")
+                with archive.open(member) as source, open(dest, 'wb') as out:
+                    for chunk in iter(lambda: source.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                        out.write(chunk)
+                if digest.hexdigest() != expected_hash:
+                    raise BundleError(f"Hash mismatch for {component}/{path}, the bundle is damaged")
+                
+                # Keep the executable bit of binaries and scripts
+                mode = (member.external_attr >> 16) & 0o777
+                if mode and os.name != 'nt':
+                    os.chmod(dest, mode)
+
+def save_build_info(build_info):
+    """build_info of the installed toolchain, bundles are exported from it"""
+    path = get_data_path('build_info.json')
+    with open(path + ".tmp", 'w') as f:
+        json.dump(build_info, f, indent=4)
+    os.replace(path + ".tmp", path)
+
+def load_build_info():
+    try:
+        with open(get_data_path('build_info.json'), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def tool_version_output(command, env=None, timeout=30):
+    """Combined stdout and stderr of a version query, None if the tool could not be run"""
+    startupinfo = None
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, errors='replace', env=env, timeout=timeout, startupinfo=startupinfo)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return (result.stdout + result.stderr).strip()
+
+class WindowsBuilder:
+    """Builds Odin and OLS with their build.bat scripts (MSVC)"""
+    odin_binary_name = "odin.exe"
+    ols_binary_name = "ols.exe"
+    odin_runtime_files = ("LLVM-C.dll",)
+    odin_build_script = "build.bat"
+    ols_build_script = "build.bat"
+    check_return_code = False  # build.bat return codes are not reliable, the binary is checked instead
+    toolchain_compiler = "cl"
+    toolchain_help = "Make sure you have the MSVC compiler installed, it's required to build Odin from source.\n\nFull Visual Studio installer\nhttps://visualstudio.microsoft.com/\n\nMSVC only (PortableBuildTools)\nhttps://github.com/Data-Oriented-House/PortableBuildTools\n\nMSVC only (python script)\nhttps://gist.github.com/mmozeiko/7f3162ec2988e81e56d5c4e22cde9977"
+
+    def __init__(self, jobs=0, llvm_config=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.toolchain_env = None
+
+    def odin_build_command(self, folder):
+        return [os.path.join(folder, self.odin_build_script), "release"]
+
+    def ols_build_command(self, folder):
+        return [os.path.join(folder, self.ols_build_script)]
+
+    def use_toolchain_env(self, env):
+        self.toolchain_env = env
+
+    def build_env(self):
+        # Without a probed toolchain build.bat locates and runs vcvars itself
+        return dict(self.toolchain_env) if self.toolchain_env else None
+
+    def toolchain_identity(self):
+        """MSVC version and target from the `cl` banner, None if cl is not in PATH"""
+        env = self.toolchain_env or os.environ
+        path = next((value for key, value in env.items() if key.upper() == "PATH"), None)
+        cl = shutil.which(self.toolchain_compiler, path=path)
+        banner = tool_version_output([cl], self.build_env()) if cl else None
+        match = re.search(r"Version ([\d.]+)(?: for (\w+))?", banner or "")
+        if not match:
+            return None
+        return f"msvc {match.group(1)} {match.group(2) or ''}".strip()
+
+    def describe(self):
+        return "build.bat (MSVC)"
+
+class UnixBuilder:
+    """Builds Odin with build_odin.sh and OLS with build.sh (clang + LLVM) on Linux and macOS"""
+    odin_binary_name = "odin"
+    ols_binary_name = "ols"
+    odin_runtime_files = ()
+    odin_build_script = "build_odin.sh"
+    ols_build_script = "build.sh"
+    check_return_code = True
+    toolchain_compiler = "clang"
+    toolchain_help = "Make sure clang and LLVM (llvm-config) are installed, they are required to build Odin from source. Set `llvm_config` in the settings if llvm-config is not found automatically.\n\nhttps://odin-lang.org/docs/install/"
+
+    # Distributions install versioned llvm-config binaries, Homebrew keeps LLVM out of PATH
+    LLVM_CONFIG_CANDIDATES = ["llvm-config"] + [f"llvm-config-{v}" for v in range(20, 10, -1)]
+    LLVM_CONFIG_PATHS = ["/opt/homebrew/opt/llvm/bin/llvm-config", "/usr/local/opt/llvm/bin/llvm-config"]
+
+    def __init__(self, jobs=0, llvm_config=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.toolchain_env = None
+        self.llvm_config_setting = llvm_config
+        self.llvm_config = llvm_config or self.detect_llvm_config()
+
+    def detect_llvm_config(self, env=None):
+        env = env or os.environ
+        if env.get("LLVM_CONFIG"):
+            return env["LLVM_CONFIG"]
+        for name in self.LLVM_CONFIG_CANDIDATES:
+            path = shutil.which(name, path=env.get("PATH"))
+            if path:
+                return path
+        for path in self.LLVM_CONFIG_PATHS:
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def use_toolchain_env(self, env):
+        self.toolchain_env = env
+        if not self.llvm_config_setting:
+            self.llvm_config = self.detect_llvm_config(env)
+
+    def odin_build_command(self, folder):
+        return [os.path.join(folder, self.odin_build_script), "release"]
+
+    def ols_build_command(self, folder):
+        # build.sh forwards its arguments to `odin build`
+        return [os.path.join(folder, self.ols_build_script), f"-thread-count:{self.jobs}"]
+
+    def build_env(self):
+        env = dict(self.toolchain_env or os.environ)
+        if self.llvm_config:
+            env["LLVM_CONFIG"] = self.llvm_config
+        return env
+
+    def toolchain_identity(self):
+        """LLVM version the Odin build links against, None if llvm-config can't be run"""
+        output = tool_version_output([self.llvm_config, "--version"], self.build_env()) if self.llvm_config else None
+        match = re.match(r"\d+(\.\d+)*\S*", output or "")
+        return f"llvm {match.group(0)}" if match else None
+
+    def describe(self):
+        return f"{self.odin_build_script}/{self.ols_build_script}, OLS -thread-count:{self.jobs}, LLVM: {self.llvm_config or 'not found'}"
+
+def create_builder(platform, jobs=0, llvm_config=None):
+    """Build backend for a sublime.platform() value"""
+    if platform == 'windows':
+        return WindowsBuilder(jobs, llvm_config)
+    return UnixBuilder(jobs, llvm_config)
+
+class ToolchainError(Exception):
+    pass
+
+def resolve_toolchain_script(setting):
+    """Setup script from the toolchain_setup_script setting, "" detects vcvars64.bat on Windows, false disables probing"""
+    if setting is False:
+        return None
+    if setting:
+        return setting
+    if sublime.platform() == 'windows':
+        return ToolchainEnvironment.detect_vcvars()
+    return None
+
+class ToolchainEnvironment:
+    """
+    Environment produced by a toolchain setup script (vcvars64.bat, a Linux/macOS env script).
+
+    The script is run once and the resulting environment is cached in a json file keyed by the script path,
+    its arguments and its mtime. Builds reuse the cached environment instead of paying for the setup script
+    on every invocation, editing or updating the script probes it again.
+    """
+    VSWHERE = os.path.join(os.environ.get("ProgramFiles(x86)", "C:\\Program Files (x86)"), "Microsoft Visual Studio", "Installer", "vswhere.exe")
+
+    def __init__(self, cache_path, timeout=120):
+        self.cache_path = cache_path
+        self.timeout = timeout
+
+    @classmethod
+    def detect_vcvars(cls):
+        """vcvars64.bat of the newest Visual Studio / Build Tools install with the C++ tools, None if not found"""
+        if not os.path.isfile(cls.VSWHERE):
+            return None
+        try:
+            result = subprocess.run(
+                [cls.VSWHERE, "-latest", "-products", "*", "-requires", "Microsoft.VisualStudio.Component.VC.Tools.x86.x64", "-property", "installationPath"],
+                capture_output=True, text=True, errors='replace', timeout=30, shell=USE_SHELL
+            )
+        except (OSError, subprocess.SubprocessError):
+            return None
+        for line in result.stdout.splitlines():
+            path = os.path.join(line.strip(), "VC", "Auxiliary", "Build", "vcvars64.bat")
+            if line.strip() and os.path.isfile(path):
+                return path
+        return None
+
+    @staticmethod
+    def cache_key(script, args):
+        return "|".join([os.path.normcase(os.path.abspath(script))] + list(args))
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, cache):
+        with open(self.cache_path + ".tmp", 'w') as f:
+            json.dump(cache, f, indent=4)
+        os.replace(self.cache_path + ".tmp", self.cache_path)
+
+    def cached(self, script, args=()):
+        """Cached environment of the script, None when missing or the script changed since it was probed"""
+        entry = self._load().get(self.cache_key(script, args))
+        try:
+            if entry and entry['mtime'] == os.path.getmtime(script):
+                return entry['env']
+        except OSError:
+            pass
+        return None
+
+    def get(self, script, args=()):
+        """(environment, probed) for the script, probing it only when the cache is stale"""
+        env = self.cached(script, args)
+        if env is not None:
+            return env, False
+        return self.probe(script, args), True
+
+    def probe(self, script, args=()):
+        """Runs the setup script and captures the environment it leaves behind, raises ToolchainError"""
+        if not os.path.isfile(script):
+            raise ToolchainError(f"Toolchain setup script not found: {script}")
+        startupinfo = None
+        if sublime.platform() == 'windows':
+            # `set` lists the environment after the script ran, the script output itself is discarded
+            command = ["cmd", "/d", "/c", "call", script] + list(args) + [">nul", "&&", "set"]
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        else:
+            # The script is sourced so exported variables survive, $0 and $@ carry the path and arguments
+            command = ["sh", "-c", '. "$0" "$@" >/dev/null 2>&1 && env', script] + list(args)
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, errors='replace', timeout=self.timeout, startupinfo=startupinfo)
+        except subprocess.TimeoutExpired:
+            raise ToolchainError(f"Toolchain setup script did not finish within {self.timeout} seconds: {script}")
+        except OSError as error:
+            raise ToolchainError(f"Toolchain setup script could not be run: {error}")
+        env = self.parse(result.stdout)
+        if result.returncode != 0 or not env:
+            detail = (result.stderr or result.stdout).strip().splitlines()[-1:] or [f"exit code {result.returncode}"]
+            raise ToolchainError(f"Toolchain setup script failed ({script}): {detail[0]}")
+        
+        cache = self._load()
+        cache[self.cache_key(script, args)] = {
+            'script': script,
+            'args': list(args),
+            'mtime': os.path.getmtime(script),
+            'probed': time.time(),
+            'env': env
+        }
+        self._save(cache)
+        return env
+
+    @staticmethod
+    def parse(output):
+        """NAME=value lines of `set`/`env`, lines without a valid name continue a multi-line value"""
+        env = {}
+        name = None
+        for line in output.splitlines():
+            key, sep, value = line.partition("=")
+            if sep and key and not key.startswith("=") and " " not in key:
+                name = key
+                env[name] = value
+            elif name is not None:
+                env[name] += "\n" + line
+        return env
+
+    def invalidate(self):
+        """Forgets every cached environment, the next build probes again"""
+        try:
+            os.remove(self.cache_path)
+        except OSError:
+            pass
+
+class UpdateLog:
+    """
+    Log pipeline for updates, build output can be thousands of lines.
+
+    Lines are written to a rotating log file right away and collected in a bounded ring buffer that is
+    flushed to the "Odin Updater" output panel on the UI thread at most once per flush interval. When the
+    panel can't keep up the oldest pending lines are dropped from the panel (never from the file).
+    """
+    PANEL_NAME = "odin_updater"
+
+    def __init__(self, window, log_path, max_lines=5000, flush_interval_ms=100, max_file_bytes=5 * 1024 * 1024, backup_count=3):
+        self.window = window
+        self.flush_interval_ms = flush_interval_ms
+        self.lock = threading.Lock()
+        self.pending = collections.deque(maxlen=max_lines)
+        self.dropped = 0
+        self.flush_scheduled = False
+
+        self.panel = None
+        if window:
+            self.panel = window.create_output_panel(self.PANEL_NAME)
+            self.panel.settings().set("word_wrap", False)
+            window.run_command("show_panel", {"panel": f"output.{self.PANEL_NAME}"})
+
+        self.file_handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=max_file_bytes, backupCount=backup_count, encoding='utf-8')
+        self.file_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        # One logger for all runs, each run attaches its file handler and removes it in close()
+        self.logger = logging.getLogger("OdinUpdater.update")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.logger.addHandler(self.file_handler)
+
+    def write(self, line, console=False):
+        self.write_lines([line], console)
+
+    def write_lines(self, lines, console=False):
+        if not lines:
+            return
+        for line in lines:
+            self.logger.info(line)
+            if console:
+                print(f"[Odin Update] {line}")
+
+        with self.lock:
+            overflow = len(self.pending) + len(lines) - self.pending.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self.pending.extend(lines)
+            schedule_flush = self.panel is not None and not self.flush_scheduled
+            self.flush_scheduled = self.flush_scheduled or schedule_flush
+
+        if schedule_flush:
+            sublime.set_timeout(self._flush, self.flush_interval_ms)
+
+    def _flush(self):
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+            self.flush_scheduled = False
+
+        text = ""
+        if dropped:
+            text += f"... {dropped} lines not shown, see {self.file_handler.baseFilename}\n"
+        text += "\n".join(lines) + "\n"
+        self.panel.run_command("append", {"characters": text, "force": True, "scroll_to_end": True})
+
+    def close(self):
+        self.logger.removeHandler(self.file_handler)
+        self.file_handler.close()
+
+class UpdateTimings:
+    """
+    Timing records for one update run: phases (scheduler stages) and steps (single commands).
+
+    Finished runs are appended to a JSON-lines history file, one run per line.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.phases = {}
+        self.steps = []
+
+    def add_phase(self, name, start, end, status):
+        with self.lock:
+            self.phases[name] = {'start': start, 'end': end, 'duration': end - start, 'status': status}
+
+    def add_step(self, description, cwd, start, end, exit_code, output_bytes):
+        with self.lock:
+            self.steps.append({
+                'description': description,
+                'cwd': cwd,
+                'start': start,
+                'end': end,
+                'duration': end - start,
+                'exit_code': exit_code,
+                'output_bytes': output_bytes,
+            })
+
+    def summary(self):
+        """Per-phase breakdown for the completion dialog"""
+        with self.lock:
+            phases = sorted(self.phases.items(), key=lambda item: item[1]['start'])
+        lines = [f"{name}: {phase['duration']:.1f}s{'' if phase['status'] == 'ok' else ' (' + phase['status'] + ')'}" for name, phase in phases]
+        lines.append(f"total: {time.time() - self.started:.1f}s")
+        return "\n".join(lines)
+
+    def to_record(self, result):
+        with self.lock:
+            return {
+                'started': self.started,
+                'finished': time.time(),
+                'duration': time.time() - self.started,
+                'result': result,
+                'phases': dict(self.phases),
+                'steps': list(self.steps),
+            }
+
+def append_update_history(path, record, max_records=100):
+    """Append one run, only the last max_records runs are kept"""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record) + "\n")
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    if len(lines) > max_records:
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.writelines(lines[-max_records:])
+        os.replace(path + ".tmp", path)
+
+def load_update_history(path):
+    """All recorded runs, oldest first, lines that can't be parsed are skipped"""
+    runs = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except ValueError:
+                    pass
+    except FileNotFoundError:
+        pass
+    return runs
+
+def median(values):
+    values = sorted(values)
+    if not values:
+        return None
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+class GitMaintenance:
+    """
+    Keeps the managed repositories fast over months of fetches.
+
+    Loose objects and packs are counted straight from the object store (no git process). When a threshold
+    is crossed, or the last maintenance is older than the interval, loose objects are packed (all packs are
+    consolidated when there are too many), the commit-graph and multi-pack-index are written and unreachable
+    objects are pruned.
+    Mirrors are never pruned since other repositories borrow their objects: their packs keep unreachable objects and
+    the mirrors are configured with gc.auto=0 and gc.pruneExpire=never, so fetches into them don't run gc either.
+    """
+    def __init__(self, state_path, loose_limit=1000, pack_limit=20, interval_days=30, log=print):
+        self.state_path = state_path
+        self.loose_limit = loose_limit
+        self.pack_limit = pack_limit
+        self.interval_days = interval_days
+        self.log = log
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, state):
+        with open(self.state_path + ".tmp", 'w') as f:
+            json.dump(state, f, indent=4)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+    @staticmethod
+    def object_stats(git_dir):
+        """(loose objects, packs) of a repository"""
+        objects = os.path.join(git_dir, "objects")
+        loose = 0
+        for name in os.listdir(objects) if os.path.isdir(objects) else []:
+            if len(name) == 2:
+                loose += len(os.listdir(os.path.join(objects, name)))
+        pack_folder = os.path.join(objects, "pack")
+        packs = len([name for name in os.listdir(pack_folder) if name.endswith(".pack")]) if os.path.isdir(pack_folder) else 0
+        return loose, packs
+
+    def due(self, git_dir):
+        """Reason why the repository needs maintenance, None when it doesn't"""
+        loose, packs = self.object_stats(git_dir)
+        state = self._load()
+        if git_dir not in state:
+            # First time this repository is seen, the interval starts now
+            state[git_dir] = {'last_run': time.time()}
+            self._save(state)
+        if loose > self.loose_limit:
+            return f"{loose} loose objects"
+        if packs > self.pack_limit:
+            return f"{packs} packs"
+        if self.interval_days and time.time() - state[git_dir]['last_run'] > self.interval_days * 24 * 60 * 60:
+            return f"last maintenance {int((time.time() - state[git_dir]['last_run']) / 86400)} days ago"
+        return None
+
+    def run(self, repo_folder, git_dir, mirror=False, coordinator=None):
+        """Runs the maintenance tasks, False when the coordinator was cancelled (an update preempted it)"""
+        loose, packs = self.object_stats(git_dir)
+        if packs > self.pack_limit:
+            # Unreachable objects become loose and are pruned once they expire, like git gc does
+            # Mirrors keep unreachable objects in the new pack, repositories borrowing from them may still need them
+            tasks = [("consolidate packs", ["repack", "-a", "-d", "-l", "-q", "--keep-unreachable"] if mirror else ["repack", "-A", "-d", "-l", "-q", "--unpack-unreachable=2.weeks.ago"])]
+        else:
+            tasks = [("pack loose objects", ["repack", "-d", "-l", "-q"])]
+        tasks += [
+            ("write commit-graph", ["commit-graph", "write", "--reachable", "--split"]),
+            ("write multi-pack-index", ["multi-pack-index", "write"]),
+        ]
+        if not mirror:
+            tasks.append(("prune", ["prune", "--expire=2.weeks.ago"]))
+            tasks.append(("prune worktrees", ["worktree", "prune"]))
+        
+        start = time.time()
+        for description, args in tasks:
+            if coordinator and coordinator.cancelled():
+                self.log(f"Git maintenance of {repo_folder} cancelled")
+                return False
+            task_start = time.time()
+            status = self._git(repo_folder, args, coordinator)
+            self.log(f"  git {description}: {time.time() - task_start:.1f}s {status}")
+        
+        state = self._load()
+        state[git_dir] = {'last_run': time.time()}
+        self._save(state)
+        new_loose, new_packs = self.object_stats(git_dir)
+        self.log(f"Git maintenance of {repo_folder} took {time.time() - start:.1f}s: {loose} -> {new_loose} loose objects, {packs} -> {new_packs} packs")
+        return True
+
+    def _git(self, repo_folder, args, coordinator, timeout=3600):
+        """Status of one maintenance task, the process is tracked so cancelling the coordinator kills it"""
+        try:
+            process = subprocess.Popen(["git"] + args, cwd=repo_folder, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=USE_SHELL, **new_process_group())
+        except OSError as e:
+            return f"failed: {str(e)}"
+        if coordinator:
+            coordinator.track(process)
+        try:
+            _, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process)
+            process.communicate()
+            return f"failed: timed out after {timeout} seconds"
+        finally:
+            if coordinator:
+                coordinator.untrack(process)
+        if coordinator and coordinator.cancelled():
+            return "cancelled"
+        return "ok" if process.returncode == 0 else f"failed: {stderr.strip()}"
+
+class CompilerBenchmark:
+    """
+    Compares the compile times of two Odin compilers on a corpus of programs.
+
+    Relative corpus paths (the examples) are resolved in each compiler's own folder, absolute ones are
+    shared. For every run the old and the new compiler build the same program at the same time in two
+    worker processes, so both see the same machine load. Reports the median of the runs per program.
+    """
+    def __init__(self, binary_name, runs=3, timeout=600, log=print):
+        self.binary_name = binary_name
+        self.runs = max(1, int(runs))
+        self.timeout = timeout
+        self.log = log
+
+    @staticmethod
+    def example_corpus(odin_folder):
+        """Relative paths of the example programs (folders with .odin files directly inside)"""
+        examples = os.path.join(odin_folder, "examples")
+        corpus = []
+        if os.path.isdir(examples):
+            for name in sorted(os.listdir(examples)):
+                path = os.path.join(examples, name)
+                if os.path.isdir(path) and any(f.endswith(".odin") for f in os.listdir(path)):
+                    corpus.append(f"examples/{name}")
+        return corpus
+
+    def run(self, old_folder, new_folder, corpus):
+        """List of (program, old median seconds, new median seconds), programs that fail with either compiler are left out"""
+        results = []
+        out_folder = tempfile.mkdtemp(prefix="odin-bench-")
+        try:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                for program in corpus:
+                    times = {'old': [], 'new': []}
+                    for _ in range(self.runs):
+                        futures = dict(
+                            (executor.submit(self._build, folder, program, os.path.join(out_folder, label)), label)
+                            for label, folder in (('old', old_folder), ('new', new_folder))
+                        )
+                        for future, label in futures.items():
+                            times[label].append(future.result())
+                    
+                    if None in times['old'] or None in times['new']:
+                        self.log(f"  {program}: does not build with both compilers, skipped")
+                        continue
+                    results.append((program, median(times['old']), median(times['new'])))
+                    self.log(f"  {program}: {results[-1][1]:.2f}s -> {results[-1][2]:.2f}s")
+        finally:
+            shutil.rmtree(out_folder, ignore_errors=True)
+        return results
+
+    def _build(self, odin_folder, program, out_folder):
+        """Seconds for one `odin build` of program, None on failure"""
+        source = program if os.path.isabs(program) else os.path.join(odin_folder, *program.split('/'))
+        os.makedirs(out_folder, exist_ok=True)
+        env = dict(os.environ)
+        env["ODIN_ROOT"] = odin_folder
+        start = time.time()
+        try:
+            result = subprocess.run(
+                [os.path.join(odin_folder, self.binary_name), "build", source, f"-out:{os.path.join(out_folder, 'bench')}"],
+                cwd=out_folder,
+                capture_output=True,
+                env=env,
+                timeout=self.timeout,
+                **new_process_group()
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        if result.returncode != 0:
+            return None
+        return time.time() - start
+
+def format_benchmark(results, threshold_percent):
+    """Summary lines and whether the new compiler is slower than the threshold in total"""
+    lines = []
+    for program, old, new in results:
+        change = (new - old) / old * 100 if old else 0
+        flag = "  ⚠ slower" if change > threshold_percent else ""
+        lines.append(f"{program}: {old:.2f}s -> {new:.2f}s ({change:+.0f}%){flag}")
+    
+    total_old = sum(old for _, old, _ in results)
+    total_new = sum(new for _, _, new in results)
+    total_change = (total_new - total_old) / total_old * 100 if total_old else 0
+    if results:
+        lines.append(f"total: {total_old:.2f}s -> {total_new:.2f}s ({total_change:+.0f}%)")
+    return lines, total_change > threshold_percent
+
+def percentile(values, percent):
+    """Nearest-rank percentile, None for no values"""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[int(rank) - 1]
+
+def process_peak_rss(process):
+    """Peak working set of a running process on Windows, in bytes. None elsewhere or when it can't be read"""
+    if os.name != 'nt':
+        return None
+    import ctypes
+    from ctypes import wintypes
+    
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage",
+                "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage"
+            )
+        ]
+    
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        if ctypes.windll.psapi.GetProcessMemoryInfo(wintypes.HANDLE(int(process._handle)), ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except (AttributeError, OSError):
+        pass
+    return None
+
+class LanguageServerError(OSError):
+    """JSON-RPC error response of the language server"""
+    pass
+
+class LanguageServerBenchmark:
+    """
+    Scripted LSP session with a language server over stdio, used to compare a new OLS with the installed one.
+
+    The workload is fixed: initialize, didOpen of a small fixture program and `rounds` rounds of completion,
+    hover and definition requests. Records the startup time (until the initialize response), the latency of
+    every answered request, the requests answered with an error and the peak resident memory of the server.
+    """
+    FIXTURE = (
+        "package bench\n"
+        "\n"
+        "import \"core:fmt\"\n"
+        "import \"core:strings\"\n"
+        "\n"
+        "Vector :: struct {\n"
+        "\tx, y: f32,\n"
+        "}\n"
+        "\n"
+        "length_squared :: proc(v: Vector) -> f32 {\n"
+        "\treturn v.x * v.x + v.y * v.y\n"
+        "}\n"
+        "\n"
+        "main :: proc() {\n"
+        "\tv := Vector{3, 4}\n"
+        "\tbuilder := strings.builder_make()\n"
+        "\tfmt.sbprintf(&builder, \"%v\", length_squared(v))\n"
+        "\tfmt.println(strings.to_string(builder))\n"
+        "}\n"
+    )
+    # (method, text the position is in, offset into that text)
+    WORKLOAD = (
+        ('textDocument/completion', "\tfmt.println", 5),
+        ('textDocument/hover', "length_squared(v))", 3),
+        ('textDocument/definition', "length_squared(v))", 3),
+    )
+
+    def __init__(self, rounds=20, timeout=30, log=print):
+        self.rounds = max(1, int(rounds))
+        self.timeout = timeout
+        self.log = log
+
+    @classmethod
+    def write_fixture(cls, folder):
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "main.odin")
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(cls.FIXTURE)
+        return path
+
+    @classmethod
+    def position(cls, needle, offset):
+        for line, text in enumerate(cls.FIXTURE.split("\n")):
+            if needle in text:
+                return {'line': line, 'character': text.index(needle) + offset}
+        raise ValueError(needle)
+
+    def run(self, binary, odin_root, fixture):
+        """{'startup', 'latency': {method: [seconds]}, 'errors': {method: count}, 'peak_rss'}, raises OSError when the server does not respond"""
+        env = dict(os.environ)
+        env["ODIN_ROOT"] = odin_root
+        env["PATH"] = odin_root + os.pathsep + env.get("PATH", "")
+        folder = os.path.dirname(fixture)
+        start = time.time()
+        process = subprocess.Popen(
+            [binary],
+            cwd=folder,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+            **new_process_group()
+        )
+        messages = collections.deque()
+        arrived = threading.Condition()
+        threading.Thread(target=self._read_messages, args=(process.stdout, messages, arrived), daemon=True).start()
+        session = {'process': process, 'messages': messages, 'arrived': arrived, 'next_id': 0}
+        try:
+            root_uri = self._uri(folder)
+            collections_option = [{'name': name, 'path': os.path.join(odin_root, name)} for name in ('base', 'core', 'vendor')]
+            self._request(session, 'initialize', {
+                'processId': os.getpid(),
+                'rootUri': root_uri,
+                'workspaceFolders': [{'uri': root_uri, 'name': "bench"}],
+                'capabilities': {'textDocument': {'hover': {'contentFormat': ['markdown', 'plaintext']}}},
+                'initializationOptions': {'collections': collections_option, 'enable_hover': True, 'enable_snippets': False}
+            })
+            startup = time.time() - start
+            self._notify(session, 'initialized', {})
+            uri = self._uri(fixture)
+            self._notify(session, 'textDocument/didOpen', {
+                'textDocument': {'uri': uri, 'languageId': 'odin', 'version': 1, 'text': self.FIXTURE}
+            })
+            
+            latency = dict((method, []) for method, _, _ in self.WORKLOAD)
+            errors = dict((method, 0) for method, _, _ in self.WORKLOAD)
+            for _ in range(self.rounds):
+                for method, needle, offset in self.WORKLOAD:
+                    sent = time.time()
+                    try:
+                        self._request(session, method, {'textDocument': {'uri': uri}, 'position': self.position(needle, offset)})
+                    except LanguageServerError:
+                        # A failed request is not a fast answer, it is counted instead of timed
+                        errors[method] += 1
+                        continue
+                    latency[method].append(time.time() - sent)
+            
+            peak_rss = process_peak_rss(process)
+            self._request(session, 'shutdown', None)
+            self._notify(session, 'exit', None)
+            peak_rss = self._wait_for_exit(process) or peak_rss
+            return {'startup': startup, 'latency': latency, 'errors': errors, 'peak_rss': peak_rss}
+        finally:
+            if process.poll() is None:
+                kill_process_tree(process)
+
+    def _uri(self, path):
+        path = os.path.abspath(path).replace("\\", "/")
+        return "file://" + ("" if path.startswith("/") else "/") + path
+
+    def _send(self, session, message):
+        message['jsonrpc'] = "2.0"
+        body = json.dumps(message).encode('utf-8')
+        try:
+            session['process'].stdin.write(f"Content-Length: {len(body)}\r\n\r\n".encode('ascii') + body)
+            session['process'].stdin.flush()
+        except BrokenPipeError:
+            raise OSError("language server exited")
+
+    def _notify(self, session, method, params):
+        self._send(session, {'method': method, 'params': params})
+
+    def _request(self, session, method, params):
+        """Sends a request and waits for its response, requests from the server are answered in the meantime"""
+        session['next_id'] += 1
+        request_id = session['next_id']
+        self._send(session, {'id': request_id, 'method': method, 'params': params})
+        deadline = time.time() + self.timeout
+        with session['arrived']:
+            while True:
+                while session['messages']:
+                    message = session['messages'].popleft()
+                    if message is None:
+                        raise OSError(f"language server exited during {method}")
+                    if message.get('id') == request_id and 'method' not in message:
+                        if 'error' in message:
+                            error = message['error'] or {}
+                            raise LanguageServerError(f"{method} failed: {error.get('message', '')} ({error.get('code')})")
+                        return message.get('result')
+                    if 'id' in message and 'method' in message:
+                        # workspace/configuration, window/workDoneProgress/create, client/registerCapability
+                        items = (message.get('params') or {}).get('items')
+                        self._send(session, {'id': message['id'], 'result': [None] * len(items) if isinstance(items, list) else None})
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise OSError(f"no response to {method} within {self.timeout}s")
+                session['arrived'].wait(remaining)
+
+    def _read_messages(self, stream, messages, arrived):
+        try:
+            while True:
+                length = None
+                while True:
+                    line = stream.readline()
+                    if not line:
+                        return
+                    line = line.strip()
+                    if not line:
+                        break
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                if length is None:
+                    continue
+                message = json.loads(stream.read(length).decode('utf-8'))
+                with arrived:
+                    messages.append(message)
+                    arrived.notify()
+        except (OSError, ValueError):
+            pass
+        finally:
+            with arrived:
+                messages.append(None)
+                arrived.notify()
+
+    def _wait_for_exit(self, process, timeout=5):
+        """Waits for the server to exit, on Linux/macOS the peak RSS comes from its resource usage"""
+        deadline = time.time() + timeout
+        if os.name == 'nt':
+            try:
+                process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                pass
+            return None
+        while time.time() < deadline:
+            try:
+                pid, status, usage = os.wait4(process.pid, os.WNOHANG)
+            except ChildProcessError:
+                return None
+            if pid:
+                process.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status
+                # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+                return usage.ru_maxrss if sublime.platform() == 'osx' else usage.ru_maxrss * 1024
+            time.sleep(0.05)
+        return None
+
+def format_lsp_benchmark(old, new, threshold_percent):
+    """
+    Summary lines (installed -> new when there is an installed OLS) and whether the new OLS is slower than the threshold
+    or answers more requests with an error
+    """
+    def change(before, after):
+        return (after - before) / before * 100 if before else 0
+    
+    lines = []
+    regression = False
+    if old:
+        startup = change(old['startup'], new['startup'])
+        slower = startup > threshold_percent and new['startup'] - old['startup'] > 0.01
+        regression = regression or slower
+        lines.append(f"startup: {old['startup'] * 1000:.0f}ms -> {new['startup'] * 1000:.0f}ms ({startup:+.0f}%){'  ⚠ slower' if slower else ''}")
+    else:
+        lines.append(f"startup: {new['startup'] * 1000:.0f}ms")
+    
+    for method, times in new['latency'].items():
+        name = method.split("/")[-1]
+        new_errors = new.get('errors', {}).get(method, 0)
+        old_errors = old.get('errors', {}).get(method, 0) if old else 0
+        if new_errors:
+            more = new_errors > old_errors
+            regression = regression or (old is not None and more)
+            lines.append(f"{name} errors: {f'{old_errors} -> ' if old else ''}{new_errors}{'  ⚠ more failed requests' if old and more else ''}")
+        if not times or (old and not old['latency'][method]):
+            # Every request failed, there is nothing to time
+            continue
+        
+        p50, p95 = percentile(times, 50) * 1000, percentile(times, 95) * 1000
+        if old:
+            old_p50, old_p95 = percentile(old['latency'][method], 50) * 1000, percentile(old['latency'][method], 95) * 1000
+            # Sub-millisecond differences are noise, not a regression
+            slower = change(old_p95, p95) > threshold_percent and p95 - old_p95 > 1
+            regression = regression or slower
+            lines.append(f"{name} p50/p95: {old_p50:.1f}/{old_p95:.1f}ms -> {p50:.1f}/{p95:.1f}ms ({change(old_p95, p95):+.0f}%){'  ⚠ slower' if slower else ''}")
+        else:
+            lines.append(f"{name} p50/p95: {p50:.1f}/{p95:.1f}ms")
+    
+    if new['peak_rss']:
+        if old and old['peak_rss']:
+            larger = change(old['peak_rss'], new['peak_rss'])
+            lines.append(f"peak RSS: {old['peak_rss'] / 1048576:.0f} MB -> {new['peak_rss'] / 1048576:.0f} MB ({larger:+.0f}%){'  ⚠ larger' if larger > threshold_percent else ''}")
+            regression = regression or larger > threshold_percent
+        else:
+            lines.append(f"peak RSS: {new['peak_rss'] / 1048576:.0f} MB")
+    return lines, regression
+
+class OdinSymbolIndex:
+    """
+    Persistent index of the declarations (procs, types, constants) in the installed base/core/vendor packages.
+
+    A file is only read again when its mtime or size changed and only parsed again when its content hash
+    changed too, so refreshing after an update is cheap. Stored as zlib compressed json.
+    """
+    VERSION = 1
+    FOLDERS = ('base', 'core', 'vendor')
+    DECLARATION = re.compile(r'^(\t?)([A-Za-z_]\w*)\s*:\s*([^:=]*?)\s*:\s*(.*)$')
+    PROC = re.compile(r'^(#\w+\s+)*proc\b')
+    TYPE = re.compile(r'^(#\w+\s+)*(struct|union|enum|bit_set|bit_field|distinct|matrix|#type)\b')
+
+    def __init__(self, path):
+        self.path = path
+        self.data = None
+
+    def load(self):
+        if self.data is None:
+            try:
+                with open(self.path, 'rb') as f:
+                    self.data = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+            except (OSError, ValueError, zlib.error):
+                self.data = None
+            if not self.data or self.data.get('version') != self.VERSION:
+                self.data = {'version': self.VERSION, 'root': None, 'files': {}}
+        return self.data
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zlib.compress(json.dumps(self.data, separators=(',', ':')).encode('utf-8')))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, odin_root):
+        """Bring the index up to date with odin_root, returns (files parsed, files total, symbols)"""
+        data = self.load()
+        if data['root'] != os.path.normpath(odin_root):
+            data['root'] = os.path.normpath(odin_root)
+            data['files'] = {}
+
+        old_files = data['files']
+        files = {}
+        parsed = 0
+        for folder in self.FOLDERS:
+            for root, dirs, names in os.walk(os.path.join(odin_root, folder)):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in names:
+                    if not name.endswith(".odin"):
+                        continue
+                    path = os.path.join(root, name)
+                    rel_path = os.path.relpath(path, odin_root).replace(os.sep, '/')
+                    stat = os.stat(path)
+                    entry = old_files.get(rel_path)
+                    if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+                        files[rel_path] = entry
+                        continue
+
+                    with open(path, 'rb') as f:
+                        content = f.read()
+                    content_hash = hashlib.sha1(content).hexdigest()
+                    if entry and entry[2] == content_hash:
+                        symbols = entry[3]
+                    else:
+                        symbols = self.parse(content.decode('utf-8', errors='replace'))
+                        parsed += 1
+                    files[rel_path] = [stat.st_mtime, stat.st_size, content_hash, symbols]
+
+        data['files'] = files
+        self.save()
+        return parsed, len(files), sum(len(entry[3]) for entry in files.values())
+
+    def parse(self, text):
+        """[name, kind, line, signature] of the package level declarations"""
+        symbols = []
+        # Indented declarations only count inside foreign and when blocks, not inside procedure bodies
+        in_declaration_block = False
+        for line_number, line in enumerate(text.split('\n'), 1):
+            if line and not line[0].isspace() and line[0] != '}':
+                in_declaration_block = line.startswith(("foreign ", "when ", "#when"))
+            match = self.DECLARATION.match(line)
+            if not match or (match.group(1) and not in_declaration_block):
+                continue
+            value = match.group(4).strip()
+            if value.startswith('='):
+                continue
+            if self.PROC.match(value) or value.startswith("proc{"):
+                kind = 'proc'
+            elif self.TYPE.match(value):
+                kind = 'type'
+            else:
+                kind = 'constant'
+            symbols.append([match.group(2), kind, line_number, value.rstrip('{ ')[:100]])
+        return symbols
+
+    def symbols(self):
+        """(name, kind, package, path relative to the Odin root, line, signature) of all indexed symbols"""
+        result = []
+        for rel_path, entry in self.load()['files'].items():
+            folder, _, package_path = rel_path.rpartition('/')[0].partition('/')
+            package = f"{folder}:{package_path}"
+            for name, kind, line, signature in entry[3]:
+                result.append((name, kind, package, rel_path, line, signature))
+        return result
+
+def process_alive(pid):
+    if os.name == 'nt':
+        # os.kill(pid, 0) would terminate the process on Windows
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        result = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True, startupinfo=startupinfo)
+        return str(pid) in result.stdout
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def kill_process_tree(process, grace_seconds=5):
+    """Stop a process started with new_process_group() and everything it spawned (git helpers, compilers)"""
+    if process.poll() is not None:
+        return
+    if os.name == 'nt':
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], capture_output=True)
+        return
+    
+    # SIGTERM first so git can remove its .lock files
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except OSError:
+        process.terminate()
+    try:
+        process.wait(grace_seconds)
+    except subprocess.TimeoutExpired:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            process.kill()
+
+def new_process_group():
+    """Popen arguments that put the child in its own process group, so kill_process_tree reaches all of it"""
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+class UpdateCoordinator:
+    """
+    Single-flight guard for updates.
+
+    An in-process lock makes sure only one update runs in this Sublime Text instance, a lockfile with the
+    owner's pid does the same across instances. Child processes of the running update are tracked so the
+    update can be cancelled. A preemptible job (background prefetch or git
+    maintenance) is cancelled when another job begins.
+    """
+    STALE_LOCK_SECONDS = 6 * 60 * 60
+    PREEMPT_TIMEOUT = 10
+    UPDATE_TASK = "An Odin update"
+
+    def __init__(self, lock_name='update.lock'):
+        self.lock_name = lock_name
+        self.lock = threading.Lock()
+        self.job = None
+        self.task = self.UPDATE_TASK
+        self.preemptible = False
+        self.lock_owner = None
+        self.processes = set()
+        self.cancel_event = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+
+    def begin(self, job, preemptible=False, task=UPDATE_TASK):
+        """Claim the update for job, False when an update is already running here or in another instance"""
+        with self.lock:
+            preempt = self.job is not None and self.preemptible and not preemptible
+        if preempt:
+            self.cancel()
+            self.idle.wait(self.PREEMPT_TIMEOUT)
+        
+        with self.lock:
+            if self.job is not None:
+                return False
+            self.lock_owner = self._acquire_lockfile()
+            if self.lock_owner is not None:
+                return False
+            self.job = job
+            self.task = task
+            self.preemptible = preemptible
+            self.cancel_event.clear()
+            self.idle.clear()
+            return True
+
+    def end(self):
+        with self.lock:
+            self.job = None
+            self.task = self.UPDATE_TASK
+            self.preemptible = False
+            self.processes.clear()
+            self.idle.set()
+            owner = self._read_lockfile()
+            if owner and owner.get('pid') == os.getpid():
+                try:
+                    os.remove(self._lock_path())
+                except OSError:
+                    pass
+
+    def is_busy(self):
+        if self.job is not None:
+            return True
+        owner = self._read_lockfile()
+        return owner is not None and not self._is_stale(owner)
+
+    def track(self, process):
+        with self.lock:
+            self.processes.add(process)
+        # Cancelled while the process was starting
+        if self.cancel_event.is_set():
+            kill_process_tree(process)
+
+    def untrack(self, process):
+        with self.lock:
+            self.processes.discard(process)
+
+    def cancel(self):
+        with self.lock:
+            if self.job is None:
+                return False
+            self.cancel_event.set()
+            processes = list(self.processes)
+        for process in processes:
+            kill_process_tree(process)
+        return True
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def _lock_path(self):
+        return get_data_path(self.lock_name)
+
+    def _acquire_lockfile(self):
+        """Create the lockfile, returns None on success or the owner of the existing lock"""
+        for _ in range(2):
+            try:
+                fd = os.open(self._lock_path(), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                owner = self._read_lockfile()
+                if owner is not None and not self._is_stale(owner):
+                    return owner
+                if owner and owner.get('pid') == os.getpid():
+                    print("[Odin Update] Replacing the update lock this process left behind before a plugin reload")
+                else:
+                    print(f"[Odin Update] Removing stale update lock {owner}")
+                try:
+                    os.remove(self._lock_path())
+                except FileNotFoundError:
+                    pass
+                continue
+            
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'pid': os.getpid(), 'started': time.time()}, f)
+            return None
+        return self._read_lockfile() or {}
+
+    def _read_lockfile(self):
+        """Contents of the lockfile, None if there is no lock"""
+        path = self._lock_path()
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # The owner may still be writing it
+            try:
+                return {'started': os.path.getmtime(path)}
+            except OSError:
+                return None
+
+    def _is_stale(self, owner):
+        pid = owner.get('pid')
+        if pid == os.getpid():
+            # Only a job in memory holds a lock of this process, without one it was left behind by a plugin reload
+            return self.job is None
+        if time.time() - owner.get('started', 0) > self.STALE_LOCK_SECONDS:
+            return True
+        if pid is None:
+            return time.time() - owner.get('started', 0) > 60
+        return not process_alive(pid)
+
+class PrefetchScheduler:
+    """
+    Fetches the Odin and OLS remotes in the background while the editor is idle.
+
+    Only refs and objects are downloaded, the working trees are never touched, so the next interactive
+    update starts with everything local. A prefetch holds the update coordinator, an update that starts
+    meanwhile cancels it. Failed fetches back off exponentially. When a newer dev tag than the installed one
+    shows up a hint is shown in the status bar.
+    """
+    STATUS_KEY = "odin_updater"
+    CHECK_INTERVAL = 60
+    MAX_BACKOFF = 24 * 60 * 60
+
+    def __init__(self):
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.last_activity = time.time()
+        self.last_attempt = 0
+        self.failures = 0
+        self.hint = ""
+    
+    def start(self):
+        if self.thread:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread = None
+
+    def touch(self):
+        """Called on editor activity, prefetching only happens once the editor has been idle for a while"""
+        self.last_activity = time.time()
+
+    def _loop(self):
+        while not self.stop_event.wait(self.CHECK_INTERVAL):
+            try:
+                if self._is_due():
+                    self.prefetch()
+            except Exception as e:
+                print(f"[Odin Update] Prefetch failed: {str(e)}")
+
+    def _is_due(self):
+        interval_minutes = odin_settings.get('prefetch_interval_minutes', 0)
+        if not interval_minutes or update_coordinator.is_busy():
+            return False
+        if time.time() - self.last_activity < odin_settings.get('prefetch_idle_seconds', 120):
+            return False
+        backoff = min(interval_minutes * 60 * (2 ** self.failures), self.MAX_BACKOFF)
+        return time.time() - self.last_attempt >= backoff
+
+    def prefetch(self):
+        # Fetching the same repositories as an update fails on ref locks, so the prefetch claims the coordinator
+        if not update_coordinator.begin(self, preemptible=True, task="A background fetch of the Odin repositories"):
+            return
+        try:
+            self._prefetch()
+        finally:
+            update_coordinator.end()
+
+    def _prefetch(self):
+        self.last_attempt = time.time()
+        odin_folder = odin_settings.get('odin_folder', '')
+        ols_folder = odin_settings.get('ols_folder', '')
+
+        ok = True
+        if odin_settings.get('git_mirror', False):
+            # With mirrors the working copies fetch from the mirror, so the mirrors are what has to be refreshed
+            mirror_folder = odin_settings.get('git_mirror_folder', '') or get_data_path('mirrors')
+            repo_urls = [odin_settings.get('odin_repo_url', '')] + ([odin_settings.get('ols_repo_url', '')] if odin_settings.get('update_ols', True) else [])
+            for repo_url in repo_urls:
+                mirror = mirror_path(mirror_folder, repo_url)
+                if os.path.exists(os.path.join(mirror, "HEAD")):
+                    ok = self._fetch(mirror, ["fetch", "--quiet", "--prune", "origin"]) and ok
+        if os.path.isdir(os.path.join(odin_folder, ".git")):
+            ok = self._fetch_odin(odin_folder) and ok
+        if odin_settings.get('update_ols', True) and os.path.isdir(os.path.join(ols_folder, ".git")):
+            ok = self._fetch(ols_folder, ["fetch", "--quiet", "origin"]) and ok
+
+        if update_coordinator.cancelled():
+            # Preempted by an update, which fetches everything itself
+            return
+        self.failures = 0 if ok else min(self.failures + 1, 16)
+        if ok:
+            self._update_hint(odin_folder)
+
+    def _fetch_odin(self, folder):
+        if not os.path.exists(os.path.join(folder, ".git", "shallow")):
+            return self._fetch(folder, ["fetch", "--quiet", "--no-tags", "origin", "+refs/heads/master:refs/remotes/origin/master", DEV_TAG_REFSPEC])
+
+        # Shallow repositories only get the commit of the newest dev tag
+        remote_tags = self._git(folder, ["ls-remote", "--tags", "--refs", "origin", "refs/tags/dev-*"])
+        if remote_tags is None:
+            return False
+        tag = latest_dev_tag(line.split("refs/tags/")[-1] for line in remote_tags.splitlines())
+        if not tag:
+            return True
+        return self._fetch(folder, ["fetch", "--quiet", "--depth", "1", "--no-tags", "origin", f"+refs/tags/{tag}:refs/tags/{tag}"])
+
+    def _fetch(self, folder, args):
+        return self._git(folder, args) is not None
+
+    def _git(self, folder, args):
+        if update_coordinator.cancelled():
+            return None
+        startupinfo = None
+        if os.name == 'nt':
+            # Background fetches should not flash console windows
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        try:
+            process = subprocess.Popen(
+                ["git"] + args,
+                cwd=folder,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                shell=USE_SHELL,
+                startupinfo=startupinfo,
+                **new_process_group()
+            )
+        except OSError as e:
+            print(f"[Odin Update] Prefetch git {args[0]} failed in {folder}: {str(e)}")
+            return None
+        
+        # Tracked so an update that preempts the prefetch can kill it
+        update_coordinator.track(process)
+        try:
+            stdout, stderr = process.communicate(timeout=odin_settings.get('prefetch_timeout_seconds', 600))
+        except subprocess.TimeoutExpired:
+            kill_process_tree(process)
+            process.communicate()
+            print(f"[Odin Update] Prefetch git {args[0]} timed out in {folder}")
+            return None
+        finally:
+            update_coordinator.untrack(process)
+        
+        if update_coordinator.cancelled():
+            return None
+        if process.returncode != 0:
+            print(f"[Odin Update] Prefetch git {args[0]} failed in {folder}: {stderr.strip()}")
+            return None
+        return stdout
+
+    def _update_hint(self, odin_folder):
+        try:
+            newest_tag = latest_dev_tag(GitMetadataReader(odin_folder).tags())
+        except (GitMetadataError, OSError):
+            return
+
+        installed = BuildFingerprintStore(get_data_path('build_fingerprints.json')).get('odin') or {}
+        installed_tag = installed.get('tag')
+        if newest_tag and installed_tag and latest_dev_tag([newest_tag, installed_tag]) != installed_tag:
+            self.set_hint(f"Odin {newest_tag} available (installed {installed_tag})")
+        else:
+            self.set_hint("")
+
+    def set_hint(self, hint):
+        self.hint = hint
+        sublime.set_timeout(self._show_hint, 0)
+
+    def _show_hint(self):
+        for window in sublime.windows():
+            for view in window.views():
+                self.show_hint(view)
+
+    def show_hint(self, view):
+        if self.hint:
+            view.set_status(self.STATUS_KEY, self.hint)
+        else:
+            view.erase_status(self.STATUS_KEY)
+
+# Background prefetching waits while an interactive update runs
+update_coordinator = UpdateCoordinator()
+prefetcher = PrefetchScheduler()
+
+def plugin_loaded():
+    prefetcher.start()
+
+def plugin_unloaded():
+    prefetcher.stop()
+    odin_settings.clear()
+    update_coordinator.cancel()
+
+class OdinUpdaterIdleListener(sublime_plugin.EventListener):
+    def on_modified_async(self, view):
+        prefetcher.touch()
+
+    def on_selection_modified_async(self, view):
+        prefetcher.touch()
+
+    def on_activated_async(self, view):
+        prefetcher.touch()
+        prefetcher.show_hint(view)
 
 class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
     def __init__(self):        
@@ -25,18 +2155,28 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
         self.git_ols_repo = None
         self.git_ols_folder = None
         self.update_ols = True
+        self.force_rebuild = False
+        self.fingerprints = None
+        self.git_fetch_mode = 'full'
+        self.artifacts = None
+        self.builder = create_builder(sublime.platform())
+        self.update_log = None
+        self.timings = None
+        self.run_result = None
+        self.staged_install = True
+        self.build_folders = {}
+        self.git_timeout = None
+        self.build_timeout = None
+        self.benchmark_summary = None
+        self.compiler_regression = False
+        self.ols_benchmark_summary = None
+        self.ols_regression = False
+        self.promotion_declined = False
+        self.ols_prebuilt = False
+        self.mirrors = {}
+        self.toolchain_id = None
+        self.settings = None
     
-    def get_setting(self, key, default=None):
-        settings = sublime.load_settings('OdinUpdater.sublime-settings')
-        os_specific_settings = {}
-        if sublime.platform() == 'windows':
-            os_specific_settings = sublime.load_settings('OdinUpdater (Windows).sublime-settings')
-        elif sublime.platform() == 'osx':
-            os_specific_settings = sublime.load_settings('OdinUpdater (OSX).sublime-settings')
-        else:
-            os_specific_settings = sublime.load_settings('OdinUpdater (Linux).sublime-settings')
-        return os_specific_settings.get(key, settings.get(key, default))
-        
     def run(self, odin_repo_url=None, odin_folder=None, ols_repo_url=None, ols_folder=None, update_ols=None):
         user_settings_path = os.path.join(sublime.packages_path(), 'User', 'OdinUpdater.sublime-settings')
         if not os.path.exists(user_settings_path):            
@@ -48,14 +2188,20 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
     "ols_repo_url": "https://github.com/DanielGavin/ols.git",
 
     // Where Odin will be installed on your system
-    "odin_folder": "C:\\\\odin",
+    "odin_folder": ODIN_FOLDER,
     
     // Where Odin Language Server will be installed on your system
-    "ols_folder": "C:\\\\ols",
+    "ols_folder": OLS_FOLDER,
 
     // Whether Odin Language Server should be installed or updated
-    "update_ols": true
+    "update_ols": true,
+
+    // How repositories are cloned and fetched: "full", "blobless" or "shallow"
+    // blobless and shallow only fetch the dev-* tags that are needed to build the latest Odin release
+    "git_fetch_mode": "full"
 }'''
+            settings_content = settings_content.replace("ODIN_FOLDER", json.dumps(default_install_folder("odin")))
+            settings_content = settings_content.replace("OLS_FOLDER", json.dumps(default_install_folder("ols")))
 
             with open(user_settings_path, 'w') as f:
                 f.write(settings_content)
@@ -64,17 +2210,73 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             sublime.message_dialog("Initial Setup\n\nUser settings created for Odin Updater. Please check that all folders in the settings are correct for your system and then run Odin Updater again.")
             return
         
+        if not update_coordinator.begin(self):
+            return self._join_running_update()
+        
+        # One snapshot for the whole update, settings edited while it runs apply to the next one.
+        # It is only taken once the update is ours, the running update's worker reads self.settings
+        self.settings = odin_settings.snapshot()
+        try:
+            self._start_update(odin_repo_url, odin_folder, ols_repo_url, ols_folder, update_ols)
+        except Exception:
+            update_coordinator.end()
+            raise
+    
+    def _join_running_update(self):
+        """A second request while an update runs shows the running update instead of starting another one"""
+        if update_coordinator.job is not None and update_coordinator.task != UpdateCoordinator.UPDATE_TASK:
+            sublime.message_dialog(f"{update_coordinator.task} is running in the background.\n\nRun the update again once it has finished.")
+            return
+        if update_coordinator.job is not None:
+            sublime.active_window().run_command("show_panel", {"panel": f"output.{UpdateLog.PANEL_NAME}"})
+            sublime.status_message("Odin update already running, showing its progress")
+            return
+        
+        owner = update_coordinator.lock_owner or {}
+        sublime.message_dialog(f"Odin Updater is already running in another Sublime Text instance (pid {owner.get('pid', 'unknown')}).\n\nWait for it to finish and try again.")
+    
+    def _start_update(self, odin_repo_url, odin_folder, ols_repo_url, ols_folder, update_ols):
+        if self.update_log:
+            self.update_log.close()
+        self.update_log = UpdateLog(
+            sublime.active_window(),
+            get_data_path('update.log'),
+            max_lines=self.settings.get('log_max_lines', 5000),
+            flush_interval_ms=self.settings.get('log_flush_interval_ms', 100),
+            max_file_bytes=self.settings.get('log_file_max_mb', 5) * 1024 * 1024
+        )
+        self.timings = UpdateTimings()
+        self.run_result = "aborted"
         self._log("Updating/Installing Odin compiler and Odin Language Server...")
         
-        window = sublime.active_window()
-        if window:
-            window.run_command("show_panel", {"panel": "console", "toggle": False})
+        self.git_odin_repo = odin_repo_url or self.settings.get('odin_repo_url', '')
+        self.git_odin_folder = normalize_path(odin_folder) or self.settings.get('odin_folder', '')
+        self.git_ols_repo = ols_repo_url or self.settings.get('ols_repo_url', '')
+        self.git_ols_folder = normalize_path(ols_folder) or self.settings.get('ols_folder', '')
+        self.update_ols = update_ols or self.settings.get('update_ols', True)
+        self.force_rebuild = self.settings.get('force_rebuild', False)
+        self.fingerprints = BuildFingerprintStore(get_data_path('build_fingerprints.json'))
+        self.git_fetch_mode = self.settings.get('git_fetch_mode', 'full')
+        if self.git_fetch_mode not in GIT_FETCH_MODES:
+            self._log(f"Unknown git_fetch_mode '{self.git_fetch_mode}', using 'full'")
+            self.git_fetch_mode = 'full'
+        
+        self.builder = create_builder(sublime.platform(), self.settings.get('build_jobs', 0), self.settings.get('llvm_config', None))
+        self.staged_install = self.settings.get('staged_install', True)
+        self.build_folders = {'odin': self.git_odin_folder, 'ols': self.git_ols_folder}
+        self.git_timeout = self.settings.get('git_timeout_seconds', 900) or None
+        self.benchmark_summary = None
+        self.compiler_regression = False
+        self.ols_benchmark_summary = None
+        self.ols_regression = False
+        self.promotion_declined = False
+        self.ols_prebuilt = False
+        self.mirrors = {}
+        self.toolchain_id = None
+        self.build_timeout = self.settings.get('build_timeout_seconds', 1800) or None
+        self.retry_policy = RetryPolicy(self.settings.get('network_retries', 3), self.settings.get('network_retry_delay_seconds', 5))
         
-        self.git_odin_repo = odin_repo_url or self.get_setting('odin_repo_url', '')
-        self.git_odin_folder = odin_folder or self.get_setting('odin_folder', '')
-        self.git_ols_repo = ols_repo_url or self.get_setting('ols_repo_url', '')
-        self.git_ols_folder = ols_folder or self.get_setting('ols_folder', '')
-        self.update_ols = update_ols or self.get_setting('update_ols', True)
+        self.artifacts = open_artifact_store(self.settings)
                 
         threading.Thread(target=self._run_async).start()
 
@@ -96,32 +2298,85 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             if not self._check_git_available():
                 return sublime.error_message(f"Odin Update failed: could not find Git, make sure Git is installed and available in system paths and try again.")
             
-            if self.update_ols:
+            if not self._prepare_toolchain():
+                return
+            self._log(f"Build backend: {self.builder.describe()}")
+            # Part of the Odin fingerprint and artifact key, a compiler upgrade rebuilds the same commit
+            self.toolchain_id = self.builder.toolchain_identity()
+            self._log(f"Toolchain: {self.toolchain_id or 'unknown'}")
+            
+            if self.update_ols and not self.staged_install:
                 self._log("Disabling LSP globally...")
                 sublime.run_command("lsp_disable_language_server_globally")
             
-            if not self._checkout_git_repo(self.git_odin_folder, self.git_odin_repo):
-                return sublime.error_message(f"Failed to checkout git repo for Odin:\n\n{self.build_info['update_error']}")
-            
+            # Odin and OLS are fetched concurrently, only the OLS build has to wait for the new compiler.
+            # With staged_install existing installations are built in a staging worktree next to the live
+            # folder and only swapped in by the promote stage once everything is built and verified.
+            scheduler = UpdateScheduler(self.settings.get('update_workers', 3), self._log, update_coordinator.cancel_event)
+            use_mirror = self.settings.get('git_mirror', False)
+            if use_mirror:
+                scheduler.add('odin_mirror', lambda: self._refresh_mirror(self.git_odin_repo))
+            scheduler.add('odin_checkout', lambda: self._checkout_git_repo(self.git_odin_folder, self.git_odin_repo), deps=['odin_mirror'] if use_mirror else [])
+            scheduler.add('odin_pull', lambda: self._pull_odin(self.git_odin_folder), deps=['odin_checkout'])
+            scheduler.add('odin_build', lambda: self._build_odin(self.build_folders['odin']), deps=['odin_pull'])
             if self.update_ols:
-                if not self._checkout_git_repo(self.git_ols_folder, self.git_ols_repo):
-                    return sublime.error_message(f"Failed to checkout git repo for Odin Language Server:\n\n{self.build_info['update_error']}")
+                if use_mirror:
+                    scheduler.add('ols_mirror', lambda: self._refresh_mirror(self.git_ols_repo))
+                scheduler.add('ols_checkout', lambda: self._checkout_git_repo(self.git_ols_folder, self.git_ols_repo), deps=['ols_mirror'] if use_mirror else [])
+                scheduler.add('ols_pull', lambda: self._pull_ols(self.git_ols_folder), deps=['ols_checkout'])
+                # OLS only waits for the new compiler when the dependency record doesn't know its version yet
+                scheduler.add('ols_prebuild', self._prebuild_ols, deps=['ols_pull', 'odin_pull'])
+                scheduler.add('ols_build', lambda: self._build_ols(self.build_folders['ols']), deps=['ols_prebuild', 'odin_build'])
+            scheduler.add('odin_verify', lambda: self._verify_odin_build(self.build_folders['odin']), deps=['odin_build'])
+            promote_deps = ['odin_verify'] + (['ols_build'] if self.update_ols else [])
+            if self.update_ols and self.settings.get('ols_benchmark', False):
+                scheduler.add('ols_benchmark', self._benchmark_language_server, deps=['ols_build'])
+                promote_deps.append('ols_benchmark')
+            if self.settings.get('compiler_benchmark', False):
+                scheduler.add('compiler_benchmark', self._benchmark_compiler, deps=['odin_verify'])
+                promote_deps.append('compiler_benchmark')
+            scheduler.add('promote', self._promote_staged_builds, deps=promote_deps)
+            if self.settings.get('symbol_index', True):
+                scheduler.add('symbol_index', self._refresh_symbol_index, deps=['promote'])
             
-            self._log(f"Updating {self.git_odin_folder}...")
-            if not self._pull_and_build_odin(self.git_odin_folder):
-                return sublime.error_message(f"Failed to pull latest and build the Odin compiler, see the log for details.\n\nMake sure you have the MSVC compiler installed, it's required to build Odin from source.\n\nFull Visual Studio installer\nhttps://visualstudio.microsoft.com/\n\nMSVC only (PortableBuildTools)\nhttps://github.com/Data-Oriented-House/PortableBuildTools\n\nMSVC only (python script)\nhttps://gist.github.com/mmozeiko/7f3162ec2988e81e56d5c4e22cde9977")
-
-            if self.update_ols:
-                self._log(f"Updating {self.git_ols_folder}...")
-                if not self._pull_and_build_ols(self.git_ols_folder):
-                    return sublime.error_message(f"Failed to pull latest and build the Odin Language Server, see the log for details")
-                
+            results = scheduler.run()
+            for name, (start, end) in scheduler.times.items():
+                self.timings.add_phase(name, start, end, results[name])
+            
+            if self.update_ols and not self.staged_install and results.get('ols_build') == 'ok':
                 self._log("Enabling LSP globally...")
                 sublime.run_command("lsp_enable_language_server_globally")
             
-            if not self._verify_odin_build(self.git_odin_folder):
+            if update_coordinator.cancelled():
+                self.run_result = "cancelled"
+                self._log("Update cancelled")
+                sublime.status_message("Odin update cancelled")
+                return
+            
+            failed_stage = scheduler.first_failure(results)
+            self.run_result = f"failed: {failed_stage}" if failed_stage else "ok"
+            if failed_stage == 'odin_checkout':
+                return sublime.error_message(f"Failed to checkout git repo for Odin:\n\n{self.build_info['update_error']}")
+            if failed_stage == 'ols_checkout':
+                return sublime.error_message(f"Failed to checkout git repo for Odin Language Server:\n\n{self.build_info['update_error']}")
+            if failed_stage in ('odin_pull', 'odin_build'):
+                return sublime.error_message(f"Failed to pull latest and build the Odin compiler, see the log for details.\n\n{self.builder.toolchain_help}")
+            if failed_stage in ('ols_pull', 'ols_build'):
+                return sublime.error_message(f"Failed to pull latest and build the Odin Language Server, see the log for details")
+            if failed_stage == 'ols_benchmark':
+                return sublime.error_message(f"The new Odin Language Server did not respond to the benchmark session, see the log for details.\n\n{self.build_info['update_error']}")
+            if failed_stage == 'odin_verify':
                 return sublime.error_message(f"Odin build failed validation\n\n{self.build_info['update_error']}")
+            if failed_stage == 'promote':
+                return sublime.error_message(f"Odin and OLS were built but could not be installed, the previous installation is still active.\n\n{self.build_info['update_error']}")
                 
+            if self.promotion_declined:
+                self.run_result = "declined"
+                message = f"Odin {self.build_info['odin_tag']} was not installed, the previous installation is still active."
+                message += f"\n\n-Compiler benchmark\n{self.benchmark_summary}"
+                self._log(message)
+                return sublime.message_dialog(message)
+            
             if self.build_info['odin_verify_msg']:
                 sublime.message_dialog(self.build_info['odin_verify_msg'])
                 
@@ -135,23 +2390,92 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             else:
                 message += f"\n\n-Odin Language Server\nSkipped (update_ols = False)"
             
+            if self.benchmark_summary:
+                message += f"\n\n-Compiler benchmark\n{self.benchmark_summary}"
+            if self.ols_benchmark_summary:
+                message += f"\n\n-OLS benchmark{' (⚠ worse than the previous OLS)' if self.ols_regression else ''}\n{self.ols_benchmark_summary}"
+            
+            message += f"\n\n-Timings\n{self.timings.summary()}"
+            
+            try:
+                save_build_info(self.build_info)
+            except OSError as e:
+                self._log(f"⚠ Could not save build info: {str(e)}")
+            
             self._log(message)
             sublime.message_dialog(message)
 
         except Exception as e:
+            self.run_result = f"error: {str(e)}"
             self._log(f"ERROR: update failed: {str(e)}")
             sublime.error_message(f"Update failed: {str(e)}")
+        
+        finally:
+            try:
+                prefetcher.set_hint("")
+                append_update_history(get_data_path('update_history.jsonl'), self.timings.to_record(self.run_result))
+            except OSError as e:
+                self._log(f"⚠ Could not write update history: {str(e)}")
+            finally:
+                if self.update_log:
+                    self.update_log.close()
+                    self.update_log = None
+                update_coordinator.end()
+                if self.settings.get('git_maintenance', True) and self.run_result != "cancelled":
+                    threading.Thread(target=self._run_git_maintenance, daemon=True).start()
 
     def _log(self, message):
-        print(f"[Odin Update] {message}")
+        if self.update_log:
+            self.update_log.write(message, console=True)
+        else:
+            print(f"[Odin Update] {message}")
+
+    def _prepare_toolchain(self):
+        """Hands the cached (or freshly probed) toolchain environment to the builder, False aborts the update"""
+        setting = self.settings.get('toolchain_setup_script')
+        script = resolve_toolchain_script(setting)
+        if not script:
+            return True
+        
+        args = self.settings.get('toolchain_setup_args', [])
+        start = time.time()
+        try:
+            env, probed = ToolchainEnvironment(get_data_path('toolchain_env.json')).get(script, args)
+        except ToolchainError as error:
+            self._log(str(error))
+            if setting:
+                sublime.error_message(f"Odin Update failed: {error}\n\nCheck `toolchain_setup_script` in the settings.\n\n{self.builder.toolchain_help}")
+                return False
+            # A detected script that fails is no worse than before, the build scripts set up the toolchain themselves
+            self._log("Continuing without a cached toolchain environment")
+            return True
+        
+        if probed:
+            self.timings.add_phase("toolchain_probe", start, time.time(), 'ok')
+            self._log(f"Toolchain environment probed from {script} ({len(env)} variables)")
+        else:
+            self._log(f"Toolchain environment: cached from {script}")
+        path = next((value for key, value in env.items() if key.upper() == "PATH"), None)
+        compiler = shutil.which(self.builder.toolchain_compiler, path=path)
+        if compiler:
+            self._log(f"Toolchain compiler: {compiler}")
+        else:
+            self._log(f"Warning: `{self.builder.toolchain_compiler}` is not in the PATH of the toolchain environment, the build will likely fail")
+        self.builder.use_toolchain_env(env)
+        return True
 
     def _check_git_available(self):
+        git_path = shutil.which("git")
+        if git_path:
+            self._log(f"Git found: {git_path}")
+            return True
+        
         try:
             result = subprocess.run(
                 ["git", "--version"],
                 capture_output=True,
                 text=True,
-                shell=True,
+                shell=USE_SHELL,
                 timeout=10
             )
 
@@ -173,7 +2497,7 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             self._log(f"ERROR: Git check failed: {str(e)}")
             return False
 
-    def _run_command_with_output(self, cmd, cwd, description=None, check_return_code=True):
+    def _run_command_with_output(self, cmd, cwd, description=None, check_return_code=True, env=None, timeout=None, output=None):
         """
         Run a command with real-time output display
 
@@ -182,8 +2506,14 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             cwd: Working directory path
             description: Optional description for logging (defaults to command)
             check_return_code: Whether to raise exception on non-zero return code
+            env: Optional environment for the process (defaults to the current environment)
+            timeout: Seconds before the process tree is killed (defaults to git_timeout_seconds)
+            output: Optional list or deque that receives the output lines
         """
         try:
+            if update_coordinator.cancelled():
+                return False
+            
             if not os.path.exists(cwd):
                 #raise Exception(f"Folder {cwd} does not exist")
                 self._log(f"Folder {cwd} does not exist")
@@ -195,23 +2525,65 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
 
             self._log(f"Running {description} in {cwd}...")
 
+            start = time.time()
+            output_bytes = 0
             process = subprocess.Popen(
                 cmd,
                 cwd=cwd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                shell=True,
-                bufsize=1
+                shell=USE_SHELL,
+                env=env,
+                **new_process_group()
             )
+            update_coordinator.track(process)
 
-            # Read and display output line by line
-            for line in iter(process.stdout.readline, ''):
-                if line.strip():
-                    self._log(f"  {line.strip()}")
+            # A hung git or build would block the read below forever, the watchdog kills it after the timeout
+            timeout = timeout or self.git_timeout
+            timed_out = threading.Event()
+            def on_timeout():
+                timed_out.set()
+                kill_process_tree(process)
+            watchdog = threading.Timer(timeout, on_timeout) if timeout else None
+            if watchdog:
+                watchdog.daemon = True
+                watchdog.start()
 
-            return_code = process.wait()
+            try:
+                # Read output in chunks, complete lines go to the output panel and log file in batches
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                partial_line = ""
+                while True:
+                    chunk = process.stdout.read1(65536)
+                    if not chunk:
+                        break
+                    output_bytes += len(chunk)
+                    lines = (partial_line + decoder.decode(chunk)).split('\n')
+                    partial_line = lines.pop()
+                    self._log_output(lines)
+                    if output is not None:
+                        output.extend(lines)
+                lines = [partial_line + decoder.decode(b'', final=True)]
+                self._log_output(lines)
+                if output is not None:
+                    output.extend(lines)
 
+                return_code = process.wait()
+            finally:
+                if watchdog:
+                    watchdog.cancel()
+                update_coordinator.untrack(process)
+            self._record_step(description, cwd, start, return_code, output_bytes)
+
+            if timed_out.is_set():
+                self._log(f"{description} timed out after {timeout}s in {cwd}")
+                if output is not None:
+                    output.append(f"timed out after {timeout}s")
+                return False
+            if update_coordinator.cancelled():
+                self._log(f"{description} cancelled in {cwd}")
+                return False
+            
             if check_return_code and return_code != 0:
                 self._log(f"{description} failed in {cwd} (return code: {return_code})")
                 return False
@@ -223,46 +2595,224 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             self._log(f"ERROR: could not _run_command_with_output: {str(e)}")
             return False
 
-    def _pull_and_build_ols(self, folder):
-        """Updated function using the generalized command runner"""
-        pull_result = self._run_command_with_output(
-            ["git", "pull"], 
-            folder, 
-            "Git pull", 
-            check_return_code=True
-        )
+    def _log_output(self, lines):
+        """Child process output, only sent to the output panel and log file to keep the console usable"""
+        lines = [f"  {line.rstrip()}" for line in lines if line.strip()]
+        if not lines:
+            return
+        if self.update_log:
+            self.update_log.write_lines(lines)
+        else:
+            for line in lines:
+                self._log(line)
+
+    def _pull_ols(self, folder):
+        if self._is_shallow_repo(folder):
+            return self._pull_ols_shallow(folder)
         
-        if not pull_result:
+        if self._use_staging(self._ols_binary(folder)):
+            if not self._run_network_command(["git", "fetch", "origin"], folder, "Git fetch"):
+                return False
+            
+            # Staging is used when the update is a fast-forward, anything else is pulled in place as before
+            head = self._get_head_commit(folder)
+            upstream = self._git_output(folder, ["rev-parse", "@{u}"])
+            if upstream and (upstream == head or self._git_output(folder, ["merge-base", "--is-ancestor", head, upstream]) is not None):
+                return self._prepare_staging('ols', folder, upstream)
+            
+            self._log("OLS update is not a fast-forward, updating in place")
+        
+        if not self._run_network_command(["git", "pull"], folder, "Git pull"):
+            return False
+        
+        self._show_repo_info(folder)
+        return True
+    
+    def _pull_ols_shallow(self, folder):
+        """
+        `git pull --depth 1` can't reconcile a moved upstream in a shallow repository, the newest commit of the
+        branch is fetched and checked out instead. There is no history to check for a fast-forward, so it is staged as is.
+        """
+        branch = self._ols_branch(folder)
+        refspec = f"+refs/heads/{branch}:refs/remotes/origin/{branch}"
+        if not self._run_network_command(["git", "fetch", "--depth", "1", "origin", refspec], folder, f"Shallow fetch {branch}"):
+            return False
+        
+        if self._use_staging(self._ols_binary(folder)):
+            return self._prepare_staging('ols', folder, f"refs/remotes/origin/{branch}")
+        
+        if not self._run_command_with_output(["git", "checkout", "-B", branch, f"refs/remotes/origin/{branch}"], folder, f"Checkout {branch}"):
             return False
+        self._show_repo_info(folder)
+        return True
+    
+    def _ols_branch(self, folder):
+        """Checked out branch, or the default branch of origin when HEAD is detached (after a staged update)"""
+        try:
+            branch = GitMetadataReader(folder).current_branch()
+        except (GitMetadataError, OSError):
+            branch = ""
+        if branch:
+            return branch
+        remote_head = self._git_output(folder, ["symbolic-ref", "--short", "refs/remotes/origin/HEAD"])
+        return remote_head.split("/", 1)[1] if remote_head and "/" in remote_head else "master"
+    
+    def _prebuild_ols(self):
+        """
+        Handle OLS before the Odin build has finished when the compiler it needs is already known. The dependency
+        record maps the Odin commit being installed to its odin_build_version, so an up to date OLS is kept or a
+        cached one restored right away, and a rebuild runs against the installed or cached compiler of that
+        version while Odin is built and verified in parallel. Otherwise ols_build waits for the new compiler.
+        """
+        if self.force_rebuild:
+            return True
+        odin_commit = self._get_head_commit(self.build_folders['odin'])
+        compiler = self.fingerprints.compiler_version(odin_commit) if self.fingerprints and odin_commit else None
+        if not compiler:
+            return True
+        
+        folder = self.build_folders['ols']
+        commit = self._get_head_commit(folder)
+        ols_binary = self._ols_binary(folder)
+        if self._is_build_up_to_date('ols', commit, None, compiler, ols_binary) or self._restore_cached_build('ols', commit, None, compiler, ols_binary):
+            self.ols_prebuilt = True
+            return True
+        
+        compiler_folder, temporary = self._find_compiler(odin_commit, compiler)
+        if not compiler_folder:
+            return True
+        try:
+            self._log(f"Building OLS with the {'cached' if temporary else 'installed'} compiler ({compiler}) while Odin is built")
+            self.ols_prebuilt = self._compile_ols(folder, commit, compiler, odin_commit, compiler_folder)
+        finally:
+            if temporary:
+                shutil.rmtree(compiler_folder, ignore_errors=True)
+        if not self.ols_prebuilt:
+            self._log("Early OLS build failed, building it again once Odin is built")
+        return True
+    
+    def _find_compiler(self, odin_commit, version):
+        """(folder with an odin binary of the version, whether the folder is temporary), (None, False) if there is none"""
+        # odin_build replaces the binary in build_folders['odin'] meanwhile, only the live install of a staged update is stable
+        if self.git_odin_folder != self.build_folders['odin'] and self._get_odin_version(self.git_odin_folder) == version:
+            return self.git_odin_folder, False
+        
+        entry = self.artifacts.find('odin', odin_commit, self.toolchain_id) if self.artifacts else None
+        if not entry:
+            return None, False
+        folder = tempfile.mkdtemp(prefix="odin-compiler-")
+        try:
+            self.artifacts.activate(entry, self._odin_binary(folder))
+        except OSError as e:
+            self._log(f"⚠ Could not use the cached Odin compiler: {str(e)}")
+            shutil.rmtree(folder, ignore_errors=True)
+            return None, False
+        return folder, True
+    
+    def _build_ols(self, folder):
+        if self.ols_prebuilt:
+            return True
+        
+        ols_binary = self._ols_binary(folder)
+        commit = self._get_head_commit(folder)
+        compiler = self._get_odin_version(self.build_folders['odin'])
+        if self._is_build_up_to_date('ols', commit, None, compiler, ols_binary):
+            return True
+        if self._restore_cached_build('ols', commit, None, compiler, ols_binary):
+            return True
         
-        build_path = os.path.join(folder, "build.bat")
-        if not os.path.exists(build_path):
-            self._log(f"build.bat not found in {folder}")
+        return self._compile_ols(folder, commit, compiler, self._get_head_commit(self.build_folders['odin']), self.build_folders['odin'])
+    
+    def _compile_ols(self, folder, commit, compiler, odin_commit, compiler_folder):
+        ols_binary = self._ols_binary(folder)
+        build_cmd = self.builder.ols_build_command(folder)
+        if not os.path.exists(build_cmd[0]):
+            self._log(f"{self.builder.ols_build_script} not found in {folder}")
             return False
 
-        return self._run_command_with_output(
-            [build_path], 
-            folder, 
-            "`build.bat`", 
-            check_return_code=False  # Ignore return code as requested
-        )        
+        # The live language server is only stopped when its binary is rebuilt in place
+        replaces_live_binary = self.staged_install and folder == self.git_ols_folder and os.path.exists(ols_binary)
+        if replaces_live_binary:
+            self._log("Disabling LSP globally...")
+            sublime.run_command("lsp_disable_language_server_globally")
+        
+        try:
+            built_before = self._binary_mtime(ols_binary)
+            if not self._run_command_with_output(
+                build_cmd, 
+                folder, 
+                f"`{self.builder.ols_build_script}`", 
+                check_return_code=self.builder.check_return_code,
+                env=self._ols_build_env(compiler_folder),
+                timeout=self.build_timeout
+            ):
+                return False
+        finally:
+            if replaces_live_binary:
+                self._log("Enabling LSP globally...")
+                sublime.run_command("lsp_enable_language_server_globally")
+        
+        if self._binary_mtime(ols_binary) == built_before:
+            # The old binary must not be verified, promoted or fingerprinted as this commit
+            self._log(f"⚠ {ols_binary} was not rebuilt, see the build log for errors")
+            return False
+        
+        self._store_fingerprint('ols', commit, None, compiler, ols_binary, odin_commit)
+        self._cache_build('ols', commit, None, compiler, ols_binary)
+        return True
+    
+    def _ols_build_env(self, compiler_folder):
+        """Build environment for OLS, compiler_folder comes first in PATH and the Odin sources being installed are the root"""
+        odin_folder = self.build_folders['odin']
+        env = dict(self.builder.build_env() or os.environ)
+        # The Odin folder stays in PATH for the runtime libraries (LLVM-C.dll) of a cached compiler
+        env["PATH"] = os.pathsep.join(dict.fromkeys([compiler_folder, odin_folder, env.get("PATH", "")]))
+        env["ODIN_ROOT"] = odin_folder
+        return env
     
-    def _pull_and_build_odin(self, folder):
+    def _pull_odin(self, folder):
         if not os.path.exists(folder):
             self._log(f"Folder {folder} does not exist")
             return False
         
+        if self._use_staging(self._odin_binary(folder)):
+            if self.git_fetch_mode == 'full':
+                if not self._run_network_command(["git", "fetch", "--tags", "origin"], folder, "Fetch tags"):
+                    return False
+                latest_tag = self._find_latest_dev_tag(folder)
+            else:
+                latest_tag = self._fetch_dev_tags(folder)
+            
+            if not latest_tag:
+                self._log(f"No dev tags found matching format dev-YYYY-MM")
+                return False
+            
+            self.build_info['odin_tag'] = latest_tag
+            return self._prepare_staging('odin', folder, latest_tag)
+        
+        if self.git_fetch_mode == 'full':
+            return self._pull_odin_full(folder)
+        
+        if self._fetch_latest_dev_tag(folder):
+            return True
+        
+        self._log("Fetching the latest dev tag failed, falling back to a full fetch")
+        if not self._fetch_full_history(folder):
+            return False
+        return self._pull_odin_full(folder)
+    
+    def _pull_odin_full(self, folder):
         if not self._run_command_with_output(["git", "checkout", "master"], folder, "Checkout master branch"):
             # Fallback: create master branch
             if not self._run_command_with_output(["git", "checkout", "-b", "master", "origin/master"], folder, "Create master branch from origin/master"):
                 self._log(f"Failed to checkout master branch")
                 return False
         
-        if not self._run_command_with_output(["git", "pull", "origin", "master"], folder, "Git pull from origin master"):
+        if not self._run_network_command(["git", "pull", "origin", "master"], folder, "Git pull from origin master"):
             self._log(f"Failed to Git Pull")
             return False
         
-        if not self._run_command_with_output(["git", "fetch", "--tags"], folder, "Fetch tags"):
+        if not self._run_network_command(["git", "fetch", "--tags"], folder, "Fetch tags"):
             self._log(f"Failed to Fetch Tags")
             return False
         
@@ -277,124 +2827,698 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             self._log(f"Failed to checkout tag: {latest_tag}")
             return False
         
-        build_path = os.path.join(folder, "build.bat")
-        if not os.path.exists(build_path):
-            self._log(f"build.bat not found in {folder}")
+        self._show_repo_info(folder)
+        return True
+    
+    def _fetch_latest_dev_tag(self, folder):
+        """Fetch only the dev-* tag refs and check out the latest one, without pulling master or other tags"""
+        latest_tag = self._fetch_dev_tags(folder)
+        if not latest_tag:
+            return False
+        
+        self.build_info['odin_tag'] = latest_tag
+        
+        if not self._run_command_with_output(["git", "checkout", latest_tag], folder, f"Checkout latest dev tag: {latest_tag}"):
+            self._log(f"Failed to checkout tag: {latest_tag}")
+            return False
+        
+        self._show_repo_info(folder)
+        return True
+    
+    def _fetch_dev_tags(self, folder):
+        """Fetch only the dev-* tag refs without touching the working tree, returns the latest dev tag"""
+        if self._is_shallow_repo(folder):
+            # Ask the remote which dev tags exist and download the single commit of the newest one
+            remote_tags = self._retry("List remote dev tags", lambda: self._git_output(folder, ["ls-remote", "--tags", "--refs", "origin", "refs/tags/dev-*"]))
+            if remote_tags is None:
+                self._log("Failed to list remote dev tags")
+                return None
+            
+            latest_tag = self._latest_dev_tag(line.split("refs/tags/")[-1] for line in remote_tags.splitlines())
+            if not latest_tag:
+                self._log(f"No dev tags found matching format dev-YYYY-MM")
+                return None
+            
+            refspec = f"+refs/tags/{latest_tag}:refs/tags/{latest_tag}"
+            if not self._run_network_command(["git", "fetch", "--depth", "1", "--no-tags", "origin", refspec], folder, f"Shallow fetch {latest_tag}"):
+                return None
+        else:
+            if not self._run_network_command(["git", "fetch", "--no-tags", "origin", DEV_TAG_REFSPEC], folder, "Fetch dev tags"):
+                return None
+            
+            latest_tag = self._find_latest_dev_tag(folder)
+            if not latest_tag:
+                self._log(f"No dev tags found matching format dev-YYYY-MM")
+                return None
+        
+        return latest_tag
+    
+    def _use_staging(self, live_binary):
+        """Stage the build when there is a working installation that should stay usable during the update"""
+        return self.staged_install and os.path.exists(live_binary)
+    
+    def _staging_folder(self, folder):
+        return os.path.normpath(folder) + ".staging"
+    
+    def _prepare_staging(self, component, folder, rev):
+        """Create a worktree of rev next to the live folder, sharing its object store, to build in"""
+        commit = self._git_output(folder, ["rev-parse", f"{rev}^{{commit}}"])
+        if not commit:
+            self._log(f"Could not resolve {rev} in {folder}")
+            return False
+        
+        staging = self._staging_folder(folder)
+        self._remove_staging(folder, staging)
+        
+        if commit == self._get_head_commit(folder):
+            self._log(f"{folder} is already at {rev}")
+            self._show_repo_info(folder)
+            return True
+        
+        if not self._run_command_with_output(["git", "worktree", "add", "--detach", staging, commit], folder, f"Create staging worktree for {rev}"):
+            return False
+        
+        self.build_folders[component] = staging
+        self._show_repo_info(staging)
+        return True
+    
+    def _remove_staging(self, folder, staging):
+        if os.path.exists(staging):
+            self._log(f"Removing old staging folder {staging}")
+            if self._git_output(folder, ["worktree", "remove", "--force", staging]) is None:
+                shutil.rmtree(staging, ignore_errors=True)
+        self._git_output(folder, ["worktree", "prune"])
+    
+    def _promote_staged_builds(self):
+        """Swap verified staging folders in place of the live folders, LSP is only disabled for the swap itself"""
+        staged = []
+        for component, live in (('odin', self.git_odin_folder), ('ols', self.git_ols_folder)):
+            staging = self.build_folders.get(component)
+            if staging and staging != live:
+                staged.append((component, live, staging, self._get_head_commit(staging)))
+        
+        if not staged:
+            return True
+        
+        if self.compiler_regression and not sublime.ok_cancel_dialog(
+            f"The new Odin compiler builds slower than the installed one:\n\n{self.benchmark_summary}\n\nInstall it anyway?",
+            "Install"
+        ):
+            # Keep the previous compiler, the staged builds are thrown away
+            self.promotion_declined = True
+            for component, live, staging, commit in staged:
+                self._remove_staging(live, staging)
+                self.build_folders[component] = live
+            return True
+        
+        swapped = []
+        if self.update_ols:
+            self._log("Disabling LSP globally...")
+            sublime.run_command("lsp_disable_language_server_globally")
+        try:
+            for component, live, staging, commit in staged:
+                if self._swap_folders(live, staging):
+                    swapped.append((component, live, staging, commit))
+        finally:
+            if self.update_ols:
+                self._log("Enabling LSP globally...")
+                sublime.run_command("lsp_enable_language_server_globally")
+        
+        ok = True
+        for component, live, staging, commit in staged:
+            if (component, live, staging, commit) in swapped:
+                ok = self._adopt_swapped_repo(live, commit) and ok
+            else:
+                # The folder could not be renamed (files in use), update the live folder in place instead
+                ok = self._promote_in_place(component, live, staging, commit) and ok
+            self.build_folders[component] = live
+        
+        return ok
+    
+    def _swap_folders(self, live, staging):
+        """Two renames: live -> live.previous, staging -> live"""
+        previous = os.path.normpath(live) + ".previous"
+        if os.path.exists(previous):
+            shutil.rmtree(previous, ignore_errors=True)
+        
+        for attempt in range(10):
+            try:
+                os.rename(live, previous)
+                break
+            except OSError as e:
+                # The language server can take a moment to exit and release its files
+                if attempt == 9:
+                    self._log(f"⚠ Could not move {live} aside: {str(e)}")
+                    return False
+                time.sleep(0.2)
+        
+        try:
+            os.rename(staging, live)
+        except OSError as e:
+            self._log(f"⚠ Could not move {staging} to {live}: {str(e)}")
+            os.rename(previous, live)
+            return False
+        
+        self._log(f"✓ Swapped {staging} -> {live}")
+        return True
+    
+    def _adopt_swapped_repo(self, live, commit):
+        """
+        After a swap the live folder is the former worktree, move the repository back into it from the
+        previous folder and point HEAD at the built commit. Untracked and ignored files of the previous
+        folder (user packages in shared/, libraries built with make) are moved over, tracked files are not touched.
+        """
+        previous = os.path.normpath(live) + ".previous"
+        try:
+            with open(os.path.join(live, ".git"), 'r') as f:
+                worktree_admin = f.read().strip()[len("gitdir:"):].strip()
+            os.remove(os.path.join(live, ".git"))
+            os.rename(os.path.join(previous, ".git"), os.path.join(live, ".git"))
+            shutil.rmtree(os.path.join(live, ".git", "worktrees", os.path.basename(worktree_admin)), ignore_errors=True)
+            
+            # The index still describes the previous tree, so --others lists exactly what git doesn't track there
+            others = self._git_output(live, ["--work-tree", previous, "ls-files", "--others", "-z"])
+            if others is None:
+                self.build_info['update_error'] = f"Could not list the untracked files of {previous}, it was kept"
+                return False
+            self._move_untracked_files(previous, live, [path for path in others.split("\0") if path])
+            
+            # A branch is only fast-forwarded, anything else detaches HEAD so no branch of the user is rewound
+            branch = GitMetadataReader(live).current_branch()
+            branch_tip = self._git_output(live, ["rev-parse", f"refs/heads/{branch}"]) if branch else None
+            if branch_tip and self._git_output(live, ["merge-base", "--is-ancestor", branch_tip, commit]) is not None:
+                update_cmd = ["update-ref", f"refs/heads/{branch}", commit, branch_tip]
+            else:
+                update_cmd = ["update-ref", "--no-deref", "HEAD", commit]
+            if self._git_output(live, update_cmd) is None or self._git_output(live, ["reset", "-q"]) is None:
+                self.build_info['update_error'] = f"Could not update the repository in {live}"
+                return False
+            self._git_output(live, ["worktree", "prune"])
+        
+        except (OSError, GitMetadataError) as e:
+            self.build_info['update_error'] = f"Could not move the repository back into {live}: {str(e)}"
+            self._log(self.build_info['update_error'])
+            return False
+        
+        # The old tree is not needed anymore, remove it without holding up the update
+        threading.Thread(target=shutil.rmtree, args=(previous, True), daemon=True).start()
+        return True
+    
+    def _move_untracked_files(self, previous, live, paths):
+        """Move files git doesn't track from the previous tree into the new one, files built for the new tree win"""
+        moved = 0
+        for path in paths:
+            # Nested repositories are listed as one folder with a trailing /
+            path = path.rstrip('/')
+            source = os.path.join(previous, *path.split('/'))
+            dest = os.path.join(live, *path.split('/'))
+            if os.path.lexists(dest) or not os.path.lexists(source):
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.rename(source, dest)
+            moved += 1
+        if moved:
+            self._log(f"Kept {moved} untracked files from the previous {live}")
+    
+    def _promote_in_place(self, component, live, staging, commit):
+        """Fallback when the folders can't be swapped: check out the commit in the live folder and copy the binary over"""
+        branch = GitMetadataReader(live).current_branch()
+        checkout_cmd = ["git", "merge", "--ff-only", commit] if branch else ["git", "checkout", "--detach", commit]
+        if not self._run_command_with_output(checkout_cmd, live, f"Update {live} in place"):
+            self.build_info['update_error'] = f"Could not update {live} to {commit}"
+            return False
+        
+        binary_name = self.builder.odin_binary_name if component == 'odin' else self.builder.ols_binary_name
+        try:
+            install_file(os.path.join(staging, binary_name), os.path.join(live, binary_name))
+        except OSError as e:
+            self.build_info['update_error'] = f"Could not install {binary_name} into {live}: {str(e)}"
+            return False
+        
+        self._remove_staging(live, staging)
+        return True
+    
+    def _benchmark_compiler(self):
+        """Compile the corpus with the installed and the new compiler, only possible when the new one was staged"""
+        new_folder = self.build_folders['odin']
+        old_folder = self.git_odin_folder
+        if new_folder == old_folder or not os.path.exists(self._odin_binary(old_folder)):
+            self._log("Compiler benchmark skipped, there is no previous compiler to compare with (staged_install is off or this is the first install)")
+            return True
+        
+        corpus = CompilerBenchmark.example_corpus(new_folder) if self.settings.get('compiler_benchmark_examples', True) else []
+        corpus += self.settings.get('compiler_benchmark_projects', [])
+        self._log(f"Compiler benchmark: {len(corpus)} programs, {self.settings.get('compiler_benchmark_runs', 3)} runs each")
+        
+        benchmark = CompilerBenchmark(self.builder.odin_binary_name, self.settings.get('compiler_benchmark_runs', 3), self.build_timeout, self._log)
+        try:
+            results = benchmark.run(old_folder, new_folder, corpus)
+        except OSError as e:
+            self._log(f"⚠ Compiler benchmark failed: {str(e)}")
+            return True
+        
+        lines, self.compiler_regression = format_benchmark(results, self.settings.get('compiler_benchmark_threshold_percent', 10))
+        self.benchmark_summary = "\n".join(lines) or "No program could be built with both compilers"
+        if self.compiler_regression:
+            self._log(f"⚠ The new compiler is slower than the installed one\n{self.benchmark_summary}")
+        return True
+    
+    def _benchmark_language_server(self):
+        """Scripted LSP session with the new OLS, and the installed one for comparison when the new one was staged"""
+        new_folder = self.build_folders['ols']
+        old_folder = self.git_ols_folder
+        benchmark = LanguageServerBenchmark(self.settings.get('ols_benchmark_rounds', 20), log=self._log)
+        fixture_folder = tempfile.mkdtemp(prefix="ols-bench-")
+        try:
+            fixture = benchmark.write_fixture(fixture_folder)
+            self._log(f"OLS benchmark: {benchmark.rounds} rounds of {', '.join(method.split('/')[-1] for method, _, _ in benchmark.WORKLOAD)}")
+            try:
+                new = benchmark.run(self._ols_binary(new_folder), self.build_folders['odin'], fixture)
+            except OSError as e:
+                self.build_info['update_error'] = f"✗ OLS benchmark failed: {str(e)}"
+                self._log(self.build_info['update_error'])
+                return False
+            
+            old = None
+            if new_folder != old_folder and os.path.exists(self._ols_binary(old_folder)):
+                try:
+                    old = benchmark.run(self._ols_binary(old_folder), self.git_odin_folder, fixture)
+                except OSError as e:
+                    self._log(f"⚠ The installed OLS could not be benchmarked: {str(e)}")
+        finally:
+            shutil.rmtree(fixture_folder, ignore_errors=True)
+        
+        lines, self.ols_regression = format_lsp_benchmark(old, new, self.settings.get('ols_benchmark_threshold_percent', 25))
+        self.ols_benchmark_summary = "\n".join(lines)
+        self._log(f"OLS benchmark{' (installed -> new)' if old else ''}\n{self.ols_benchmark_summary}")
+        if self.ols_regression:
+            self._log("⚠ The new OLS is slower or fails more requests than the installed one")
+        return True
+    
+    def _run_git_maintenance(self):
+        """Background maintenance of the repositories (and mirrors) that crossed a threshold, after the update"""
+        maintenance = GitMaintenance(
+            get_data_path('git_maintenance.json'),
+            loose_limit=self.settings.get('git_maintenance_loose_objects', 1000),
+            pack_limit=self.settings.get('git_maintenance_packs', 20),
+            interval_days=self.settings.get('git_maintenance_interval_days', 30),
+            log=lambda message: print(f"[Odin Update] {message}")
+        )
+        repos = [(self.git_odin_folder, False)] + ([(self.git_ols_folder, False)] if self.update_ols else [])
+        repos += [(mirror, True) for mirror in self.mirrors.values()]
+        
+        due = []
+        for folder, is_mirror in repos:
+            git_dir = folder if is_mirror else os.path.join(folder, ".git")
+            if not os.path.isdir(git_dir):
+                continue
+            try:
+                reason = maintenance.due(git_dir)
+            except OSError:
+                continue
+            if reason:
+                due.append((folder, git_dir, is_mirror, reason))
+        
+        # Maintenance rewrites packs, it must not overlap with the next update, which preempts it like a prefetch
+        if not due or not update_coordinator.begin(maintenance, preemptible=True, task="Git maintenance of the Odin repositories"):
+            return
+        try:
+            for folder, git_dir, is_mirror, reason in due:
+                print(f"[Odin Update] Git maintenance of {folder} ({reason})")
+                if not maintenance.run(folder, git_dir, is_mirror, update_coordinator):
+                    break
+        finally:
+            update_coordinator.end()
+    
+    def _refresh_symbol_index(self):
+        """Index the installed packages for Go to Odin symbol, a failure here does not fail the update"""
+        try:
+            parsed, total, symbol_count = OdinSymbolIndex(get_data_path('symbol_index.json.z')).refresh(self.git_odin_folder)
+            self._log(f"Symbol index: {symbol_count} symbols in {total} files ({parsed} parsed)")
+        except (OSError, ValueError) as e:
+            self._log(f"⚠ Could not update the symbol index: {str(e)}")
+        return True
+    
+    def _fetch_full_history(self, folder):
+        """Turn a shallow repository into a complete one, used when an operation needs history"""
+        if not self._is_shallow_repo(folder):
+            return True
+        
+        return self._run_network_command(
+            ["git", "fetch", "--unshallow", "--tags", "origin", "+refs/heads/*:refs/remotes/origin/*"],
+            folder,
+            "Fetch full history"
+        )
+    
+    def _is_shallow_repo(self, folder):
+        return os.path.exists(os.path.join(folder, ".git", "shallow"))
+    
+    def _mirror_folder(self):
+        return self.settings.get('git_mirror_folder', '') or get_data_path('mirrors')
+    
+    def _refresh_mirror(self, repo_url):
+        """Create or fetch the bare mirror of repo_url, once per update. Without a mirror the upstream is used directly"""
+        mirror_folder = self._mirror_folder()
+        mirror = mirror_path(mirror_folder, repo_url)
+        
+        marker = os.path.join(mirror, INCOMPLETE_CLONE_MARKER)
+        if not os.path.exists(os.path.join(mirror, "HEAD")):
+            # Set up like `git clone --mirror`, but an interrupted first fetch is kept and resumed by the next update
+            os.makedirs(mirror, exist_ok=True)
+            self._git_output(mirror, ["init", "--quiet", "--bare"])
+            self._git_output(mirror, ["config", "remote.origin.url", repo_url])
+            self._git_output(mirror, ["config", "remote.origin.fetch", "+refs/*:refs/*"])
+            self._git_output(mirror, ["config", "remote.origin.mirror", "true"])
+            open(marker, 'w').close()
+        
+        # Working repositories borrow objects from the mirror (alternates). An object that only they still reference
+        # becomes unreachable in the mirror after `fetch --prune`, so the mirror must never gc or prune it
+        if self._git_output(mirror, ["config", "--get", "gc.pruneExpire"]) != "never":
+            self._git_output(mirror, ["config", "gc.auto", "0"])
+            self._git_output(mirror, ["config", "gc.autoPackLimit", "0"])
+            self._git_output(mirror, ["config", "gc.pruneExpire", "never"])
+        
+        if os.path.exists(marker):
+            self._log(f"Creating mirror of {repo_url}...")
+            branch = self._remote_default_branch(mirror)
+            ok = branch is not None and self._fetch_checkpoints(mirror) and self._run_network_command(["git", "fetch", "--prune", "origin"], mirror, f"Create mirror of {repo_url}")
+            if ok:
+                self._git_output(mirror, ["symbolic-ref", "HEAD", f"refs/heads/{branch}"])
+                os.remove(marker)
+        else:
+            ok = self._run_network_command(["git", "fetch", "--prune", "origin"], mirror, f"Refresh mirror of {repo_url}")
+        
+        if ok:
+            self.mirrors[repo_url] = mirror
+        elif not os.path.exists(marker):
+            # Repositories borrow objects from the mirror, an outdated mirror is still better than switching them away
+            self._log(f"⚠ Could not refresh the mirror of {repo_url}, using it as it is")
+            self.mirrors[repo_url] = mirror
+        else:
+            self._log(f"⚠ Mirror of {repo_url} is not available, using the repository directly")
+        return True
+    
+    def _configure_origin(self, folder, repo_url):
+        """Point origin and alternates of an existing repository at the mirror, or undo that when the mirror is turned off"""
+        mirror = self.mirrors.get(repo_url)
+        mirror_folder = os.path.normpath(self._mirror_folder())
+        git_folder = os.path.join(folder, ".git")
+        origin = self._git_output(folder, ["config", "--get", "remote.origin.url"])
+        uses_mirror = bool(origin) and os.path.normpath(origin).startswith(mirror_folder + os.sep)
+        
+        alternates_path = os.path.join(git_folder, "objects", "info", "alternates")
+        try:
+            with open(alternates_path, 'r') as f:
+                alternates = [line.strip() for line in f if line.strip()]
+        except OSError:
+            alternates = []
+        borrowed = [path for path in alternates if os.path.normpath(path).startswith(mirror_folder + os.sep)]
+        
+        if mirror and not self.settings.get('git_mirror_dissociate', False):
+            mirror_objects = os.path.join(mirror, "objects")
+            if mirror_objects not in alternates:
+                os.makedirs(os.path.dirname(alternates_path), exist_ok=True)
+                with open(alternates_path, 'w') as f:
+                    f.write("\n".join(alternates + [mirror_objects]) + "\n")
+        elif borrowed:
+            # Copy the borrowed objects into the repository before it stops depending on the mirror
+            if self._run_command_with_output(["git", "repack", "-a", "-d", "-q"], folder, "Copy objects from the mirror"):
+                remaining = [path for path in alternates if path not in borrowed]
+                if remaining:
+                    with open(alternates_path, 'w') as f:
+                        f.write("\n".join(remaining) + "\n")
+                else:
+                    os.remove(alternates_path)
+        
+        if mirror or uses_mirror:
+            wanted = mirror or repo_url
+            if self._git_output(folder, ["remote", "get-url", "origin"]) != wanted:
+                self._log(f"Setting origin of {folder} to {wanted}")
+                self._git_output(folder, ["remote", "set-url", "origin", wanted])
+    
+    def _clone_options(self):
+        if self.git_fetch_mode == 'blobless':
+            return ["--filter=blob:none"]
+        if self.git_fetch_mode == 'shallow':
+            return ["--depth", "1", "--no-tags"]
+        return []
+    
+    def _build_odin(self, folder):
+        odin_binary = self._odin_binary(folder)
+        commit = self._get_head_commit(folder)
+        tag = self.build_info['odin_tag']
+        if self._is_build_up_to_date('odin', commit, tag, self.toolchain_id, odin_binary):
+            return True
+        if self._restore_cached_build('odin', commit, tag, self.toolchain_id, odin_binary):
+            return True
+        
+        build_cmd = self.builder.odin_build_command(folder)
+        if not os.path.exists(build_cmd[0]):
+            self._log(f"{self.builder.odin_build_script} not found in {folder}")
+            return False
+
+        built_before = self._binary_mtime(odin_binary)
+        if not self._run_command_with_output(build_cmd, folder, f"`{self.builder.odin_build_script} release`", check_return_code=self.builder.check_return_code, env=self.builder.build_env(), timeout=self.build_timeout):
+            self._log("Failed building Odin")
+            return False
+        elif self._binary_mtime(odin_binary) == built_before:
+            # The build script failed without a return code, the old binary must not pass as this commit
+            self._log(f"⚠ {odin_binary} was not rebuilt, see the build log for errors")
+            return False
+        else:
+            self._log("Odin build completed")
+            self._store_fingerprint('odin', commit, tag, self.toolchain_id, odin_binary)
+            self._cache_build('odin', commit, tag, self.toolchain_id, odin_binary)
+            return True
+    
+    def _odin_binary(self, odin_folder):
+        return os.path.join(odin_folder, self.builder.odin_binary_name)
+    
+    def _ols_binary(self, ols_folder):
+        return os.path.join(ols_folder, self.builder.ols_binary_name)
+    
+    def _binary_mtime(self, path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+    
+    def _is_build_up_to_date(self, component, commit, tag, compiler, binary_path):
+        """Check the persisted fingerprint, a matching fingerprint means the build can be skipped"""
+        if self.force_rebuild or not self.fingerprints:
+            return False
+        
+        if self.fingerprints.matches(component, commit, tag, compiler, binary_path):
+            self._log(f"✓ {component} is up to date ({commit[:10]}), skipping build")
+            return True
+        
+        return False
+    
+    def _store_fingerprint(self, component, commit, tag, compiler, binary_path, odin_commit=None):
+        binary_hash = file_sha256(binary_path)
+        if not self.fingerprints or not commit or not binary_hash:
+            self._log(f"⚠ Could not fingerprint {component} build (binary {binary_path} missing?)")
+            return
+        
+        fingerprint = {
+            'commit': commit,
+            'tag': tag,
+            'compiler': compiler,
+            'binary_hash': binary_hash,
+        }
+        if odin_commit:
+            fingerprint['odin_commit'] = odin_commit
+        self.fingerprints.set(component, fingerprint)
+    
+    def _restore_cached_build(self, component, commit, tag, compiler, binary_path):
+        """Install a binary from the artifact cache instead of building it, True if one was found"""
+        if self.force_rebuild or not self.artifacts or not commit:
+            return False
+        
+        entry = self.artifacts.find(component, commit, compiler)
+        if not entry:
             return False
-
-        if not self._run_command_with_output([build_path, "release"], folder, "`build.bat release`", check_return_code=False):
-            self._log("Failed building Odin")
+        
+        try:
+            self.artifacts.activate(entry, binary_path)
+        except OSError as e:
+            self._log(f"⚠ Could not restore cached {component} build: {str(e)}")
             return False
-        else:
-            self._log("Odin build completed")
-            return True
-
-    def _find_latest_dev_tag(self, folder):
+        
+        self._log(f"✓ Restored {component} ({commit[:10]}) from artifact cache, skipping build")
+        self._store_fingerprint(component, commit, tag, compiler, binary_path)
+        return True
+    
+    def _cache_build(self, component, commit, tag, compiler, binary_path):
+        if not self.artifacts or not commit:
+            return
+        
         try:
+            if self.artifacts.add(component, commit, tag, compiler, binary_path):
+                self._log(f"Cached {component} build ({commit[:10]}) in artifact store")
+        except OSError as e:
+            self._log(f"⚠ Could not cache {component} build: {str(e)}")
+    
+    def _record_step(self, description, cwd, start, exit_code, output_bytes):
+        if self.timings:
+            self.timings.add_step(description, cwd, start, time.time(), exit_code, output_bytes)
+    
+    def _get_head_commit(self, folder):
+        try:
+            return GitMetadataReader(folder).head()
+        except (GitMetadataError, OSError):
+            return self._git_output(folder, ["rev-parse", "HEAD"])
+    
+    def _git_output(self, folder, args):
+        """Run a git command and return its stripped stdout, None on failure"""
+        try:
+            start = time.time()
             result = subprocess.run(
-                ["git", "tag", "-l"], 
-                cwd=folder, 
-                capture_output=True, 
+                ["git"] + args,
+                cwd=folder,
+                capture_output=True,
                 text=True,
-                shell=True
+                shell=USE_SHELL,
+                timeout=self.git_timeout
             )
+            self._record_step(f"git {' '.join(args)}", folder, start, result.returncode, len(result.stdout) + len(result.stderr))
             if result.returncode != 0:
                 return None
-
-            # Filter dev tags matching pattern dev-YYYY-MM
-            dev_tags = []
-            pattern = re.compile(r'^dev-(\d{4})-(\d{2})$')
-
-            for tag in result.stdout.strip().split('\n'):
-                tag = tag.strip()
-                if not tag:  # Skip empty lines
-                    continue
-                match = pattern.match(tag)
-                if match:
-                    year, month = int(match.group(1)), int(match.group(2))
-                    dev_tags.append((tag, year, month))
-
-            if not dev_tags:
-                return None
-
-            # Sort by year, then month, and return the latest
-            dev_tags.sort(key=lambda x: (x[1], x[2]), reverse=True)
-            self._log(f"Found latest dev tag: {dev_tags[0][0]}")
-            return dev_tags[0][0]
-            
+            return result.stdout.strip()
+        
         except Exception as e:
-            self._log(f"ERROR: could not retrieve tags: {str(e)}")
+            self._log(f"ERROR: git {' '.join(args)} failed: {str(e)}")
             return None
-            
-    def _show_repo_info(self, folder):
-        """Display basic repository information"""
+    
+    def _get_odin_version(self, odin_folder):
+        """Output of `odin version` for the compiler in odin_folder, None if it could not run"""
+        odin_exe = self._odin_binary(odin_folder)
+        if not os.path.exists(odin_exe):
+            return None
+        
         try:
-            # Get current branch
             result = subprocess.run(
-                ["git", "branch", "--show-current"],
-                cwd=folder,
+                [odin_exe, "version"],
                 capture_output=True,
                 text=True,
-                shell=True
+                shell=USE_SHELL,
+                timeout=10
             )
-            if result.returncode == 0:
-                branch = result.stdout.strip()
-                self._log(f"Current branch: {branch}")
+            if result.returncode != 0:
+                return None
+            return result.stdout.strip()
+        
+        except Exception as e:
+            self._log(f"ERROR: could not get odin version: {str(e)}")
+            return None
 
-            # Get latest commit info
-            result = subprocess.run(
-                ["git", "log", "-1", '--pretty="%h|%an|%ad|%s"', "--date=iso"],
-                cwd=folder,
-                capture_output=True,
-                text=True,
-                shell=True
-            )
-            if result.returncode == 0:
-                commit_info = result.stdout.strip()
-                if commit_info:
-                    self._log(commit_info)
-                    # Parse the formatted output: hash|author|date|subject
-                    parts = commit_info.split('|', 3)
-                    if len(parts) >= 4:
-                        commit_hash, author, date, subject = parts
-
-                        self._log(f"Latest commit: {commit_hash} - {subject}")
-                        self._log(f"Author: {author}")
-                        self._log(f"Date: {date}")
-
-                        # Store commit info based on folder
-                        if "odin" in folder.lower():
-                            self.build_info['odin_commit'] = f"{commit_hash} - {subject}"
-                            self.build_info['odin_author'] = author
-                            self.build_info['odin_date'] = date
-                        elif "ols" in folder.lower():
-                            self.build_info['ols_commit'] = f"{commit_hash} - {subject}"
-                            self.build_info['ols_author'] = author
-                            self.build_info['ols_date'] = date
+    def _find_latest_dev_tag(self, folder):
+        try:
+            return self._latest_dev_tag(GitMetadataReader(folder).tags())
+        except (GitMetadataError, OSError, ValueError) as e:
+            self._log(f"Reading tags from .git failed ({str(e)}), using git CLI")
+        
+        tags = self._git_output(folder, ["tag", "-l"])
+        if tags is None:
+            self._log(f"ERROR: could not retrieve tags")
+            return None
+
+        return self._latest_dev_tag(tags.split('\n'))
+    
+    def _latest_dev_tag(self, tags):
+        latest_tag = latest_dev_tag(tags)
+        if latest_tag:
+            self._log(f"Found latest dev tag: {latest_tag}")
+        return latest_tag
+            
+    def _show_repo_info(self, folder):
+        """Display basic repository information"""
+        try:
+            info = self._read_repo_info(folder)
+            if info is None:
+                return
+            
+            if info['branch'] is not None:
+                self._log(f"Current branch: {info['branch']}")
+            
+            if info['hash']:
+                commit_hash, author, date, subject = info['hash'], info['author'], info['date'], info['subject']
+
+                self._log(f"Latest commit: {commit_hash} - {subject}")
+                self._log(f"Author: {author}")
+                self._log(f"Date: {date}")
+
+                # Store commit info based on folder
+                if "odin" in folder.lower():
+                    self.build_info['odin_commit'] = f"{commit_hash} - {subject}"
+                    self.build_info['odin_author'] = author
+                    self.build_info['odin_date'] = date
+                elif "ols" in folder.lower():
+                    self.build_info['ols_commit'] = f"{commit_hash} - {subject}"
+                    self.build_info['ols_author'] = author
+                    self.build_info['ols_date'] = date
 
         except Exception as e:
             self._log(f"ERROR: could not retrieve repository info: {str(e)}")
+    
+    def _read_repo_info(self, folder):
+        """Branch and latest commit info, read from .git directly with the git CLI as fallback"""
+        try:
+            reader = GitMetadataReader(folder)
+            info = reader.read_commit(reader.head())
+            info['branch'] = reader.current_branch()
+            return info
+        except (GitMetadataError, OSError, ValueError, zlib.error) as e:
+            self._log(f"Reading commit from .git failed ({str(e)}), using git CLI")
+        
+        info = {'branch': None, 'hash': None, 'author': None, 'date': None, 'subject': None}
+        
+        # Get current branch
+        info['branch'] = self._git_output(folder, ["branch", "--show-current"])
+
+        # Get latest commit info
+        commit_info = self._git_output(folder, ["log", "-1", '--pretty="%h|%an|%ad|%s"', "--date=iso"])
+        if commit_info:
+            commit_info = commit_info.strip('"')
+            # Parse the formatted output: hash|author|date|subject
+            parts = commit_info.split('|', 3)
+            if len(parts) >= 4:
+                info['hash'], info['author'], info['date'], info['subject'] = parts
+        
+        return info
          
     def _checkout_git_repo(self, folder, repo_url):
         try:
-            if os.path.exists(os.path.join(folder, ".git")):
+            git_folder = os.path.join(folder, ".git")
+            if os.path.exists(git_folder) and not self._is_incomplete_clone(folder):
                 self._log(f"Git repo already exists {folder} [{repo_url}]...")
+                self._configure_origin(folder, repo_url)
                 self._show_repo_info(folder)
                 return True
             
-            if os.path.exists(folder):
+            if not os.path.exists(git_folder) and os.path.exists(os.path.join(folder, ToolchainBundle.INSTALL_MARKER)):
+                return self._replace_bundle_install(folder, repo_url)
+            
+            if os.path.exists(folder) and not os.path.exists(git_folder) and os.listdir(folder):
                 self.build_info['update_error'] = f"ERROR: {folder} already exists and does not contain a valid .git repository. If this is an existing OLS or Odin installation it has to be a source build with a .git repository for this update script to work.\n\nRemove the folder and try again. The script will do a checkout from the official repository."
                 
                 return False
             
-            self._log(f"Cloning {repo_url} to {folder}...")
             os.makedirs(folder, exist_ok=True)
             
-            if not self._run_command_with_output(["git", "clone", repo_url, "."], folder, "Git Clone", check_return_code=True):
-                self._log(f"Failed to clone {folder} {repo_url}")
+            mirror = self.mirrors.get(repo_url)
+            if mirror and not os.path.exists(git_folder):
+                self._log(f"Cloning {repo_url} to {folder}...")
+                # Objects stay in the mirror (alternates) unless the clone is dissociated, fetches go to the mirror
+                clone_cmd = ["git", "clone", "--shared"] + (["--dissociate"] if self.settings.get('git_mirror_dissociate', False) else []) + [mirror, "."]
+                if not self._run_command_with_output(clone_cmd, folder, "Git Clone (mirror)", check_return_code=True):
+                    self._log(f"Failed to clone {folder} {repo_url}")
+                    return False
+            elif not self._clone_in_place(folder, repo_url):
+                self._log(f"Failed to clone {folder} {repo_url}, the next update continues where this one stopped")
                 return False
             
-            if os.path.exists(os.path.join(folder, ".git")):
+            if os.path.exists(git_folder):
                 self._log(f"Repository cloned successfully {folder}")
                 self._show_repo_info(folder)
                 return True
@@ -405,6 +3529,121 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
         except Exception as e:
             self._log(f"ERROR: checkout_git_repo failed: {str(e)}")
             return False
+    
+    def _replace_bundle_install(self, folder, repo_url):
+        """A folder installed from a bundle is moved aside and replaced by a clone, it is put back if the clone fails"""
+        self._log(f"{folder} was installed from a bundle, replacing it with a checkout of {repo_url}")
+        backup = os.path.normpath(folder) + ".bundle-install"
+        if os.path.exists(backup):
+            shutil.rmtree(backup)
+        os.rename(folder, backup)
+        if self._checkout_git_repo(folder, repo_url):
+            # Binaries are kept, the build is skipped when the checkout is at the commit of the bundle
+            for name in os.listdir(backup):
+                source = os.path.join(backup, name)
+                if name != ToolchainBundle.INSTALL_MARKER and os.path.isfile(source) and not os.path.exists(os.path.join(folder, name)):
+                    os.rename(source, os.path.join(folder, name))
+            shutil.rmtree(backup, ignore_errors=True)
+            return True
+        
+        self._log(f"Restoring the bundle install in {folder}")
+        shutil.rmtree(folder, ignore_errors=True)
+        os.rename(backup, folder)
+        return False
+    
+    def _is_incomplete_clone(self, folder):
+        """Clone that was interrupted before its first checkout, by this updater or by an older `git clone`"""
+        if os.path.exists(os.path.join(folder, ".git", INCOMPLETE_CLONE_MARKER)):
+            return True
+        # A killed `git clone` leaves no refs at all. HEAD alone can fail to resolve for other reasons (safe.directory,
+        # a timeout) and resuming would reset the branch of a working checkout
+        return self._get_head_commit(folder) is None and self._git_output(folder, ["for-each-ref", "--count=1"]) == ""
+    
+    def _clone_in_place(self, folder, repo_url):
+        """
+        Clone with init, fetch and checkout instead of `git clone`. The partial repository of an interrupted
+        clone is kept and the next update resumes it, fetching only what is still missing.
+        """
+        git_folder = os.path.join(folder, ".git")
+        if os.path.exists(git_folder):
+            self._log(f"Resuming interrupted clone of {repo_url} in {folder}...")
+        else:
+            self._log(f"Cloning {repo_url} to {folder} ({self.git_fetch_mode})...")
+            if self._git_output(folder, ["init", "--quiet"]) is None:
+                return False
+        open(os.path.join(git_folder, INCOMPLETE_CLONE_MARKER), 'w').close()
+        
+        if self._git_output(folder, ["remote", "get-url", "origin"]) is None:
+            self._git_output(folder, ["remote", "add", "origin", self.mirrors.get(repo_url) or repo_url])
+        self._configure_origin(folder, repo_url)
+        
+        branch = self._remote_default_branch(folder)
+        if not branch:
+            self._log(f"Could not reach {repo_url}")
+            return False
+        
+        if self.git_fetch_mode == 'shallow':
+            # Same configuration as `git clone --depth 1 --no-tags` (single branch, no tags)
+            self._git_output(folder, ["config", "remote.origin.fetch", f"+refs/heads/{branch}:refs/remotes/origin/{branch}"])
+            self._git_output(folder, ["config", "remote.origin.tagOpt", "--no-tags"])
+            fetch_cmd = ["git", "fetch", "--depth", "1", "origin"]
+        else:
+            filter_options = self._clone_options()
+            if not self._fetch_checkpoints(folder, filter_options):
+                return False
+            fetch_cmd = ["git", "fetch", "--tags"] + filter_options + ["origin"]
+        
+        if not self._run_network_command(fetch_cmd, folder, f"Git fetch ({self.git_fetch_mode})"):
+            return False
+        
+        # Blobless checkouts download file contents, so the checkout is retried like a fetch
+        if not self._run_network_command(["git", "checkout", "-B", branch, "--track", f"origin/{branch}"], folder, f"Checkout {branch}"):
+            return False
+        self._git_output(folder, ["remote", "set-head", "origin", branch])
+        os.remove(os.path.join(git_folder, INCOMPLETE_CLONE_MARKER))
+        return True
+    
+    def _remote_default_branch(self, folder):
+        output = self._retry("Query default branch", lambda: self._git_output(folder, ["ls-remote", "--symref", "origin", "HEAD"]))
+        match = re.search(r'^ref: refs/heads/(\S+)\s+HEAD', output or "", re.MULTILINE)
+        return match.group(1) if match else None
+    
+    def _fetch_checkpoints(self, folder, fetch_options=()):
+        """
+        Download the history in steps of CLONE_CHECKPOINT_TAGS dev tags, oldest first. Every finished step leaves
+        its tag behind, so an interrupted first download continues from the last step instead of from zero.
+        """
+        remote_tags = self._retry("List remote dev tags", lambda: self._git_output(folder, ["ls-remote", "--tags", "--refs", "origin", "refs/tags/dev-*"]))
+        if remote_tags is None:
+            return False
+        
+        # Repositories without dev tags (OLS) are fetched in one go
+        tags = sorted_dev_tags(line.split("refs/tags/")[-1] for line in remote_tags.splitlines())
+        for tag in tags[CLONE_CHECKPOINT_TAGS - 1:-1:CLONE_CHECKPOINT_TAGS]:
+            if self._git_output(folder, ["rev-parse", "--verify", "--quiet", f"refs/tags/{tag}"]):
+                continue
+            refspec = f"+refs/tags/{tag}:refs/tags/{tag}"
+            if not self._run_network_command(["git", "fetch", "--no-tags"] + list(fetch_options) + ["origin", refspec], folder, f"Fetch history up to {tag}"):
+                return False
+        return True
+    
+    def _retry(self, description, action):
+        """Run a network step under the retry policy (network_retries, network_retry_delay_seconds)"""
+        return self.retry_policy.run(action, description, self._log, update_coordinator.cancel_event)
+    
+    def _run_network_command(self, cmd, cwd, description=None):
+        """Command that talks to the remote, retried only when its output shows a failure of the transport"""
+        output = collections.deque(maxlen=50)
+        def attempt():
+            output.clear()
+            return self._run_command_with_output(cmd, cwd, description, output=output)
+        return self.retry_policy.run(
+            attempt,
+            description or " ".join(cmd),
+            self._log,
+            update_coordinator.cancel_event,
+            retryable=lambda: any(TRANSIENT_GIT_ERROR_PATTERN.search(line) for line in output)
+        )
             
     def _check_odin_available(self):
         """Check if odin executable is available and show detailed information"""
@@ -414,7 +3653,7 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
                 ["odin", "version"],
                 capture_output=True,
                 text=True,
-                shell=True,
+                shell=USE_SHELL,
                 timeout=10
             )
 
@@ -428,7 +3667,7 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
                         ["where", "odin"] if os.name == 'nt' else ["which", "odin"],
                         capture_output=True,
                         text=True,
-                        shell=True,
+                        shell=USE_SHELL,
                         timeout=5
                     )
                     if path_result.returncode == 0:
@@ -454,10 +3693,10 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
         
     def _verify_odin_build(self, odin_folder):
         """Verify that Odin was built successfully"""
-        odin_exe = os.path.join(odin_folder, "odin.exe")
+        odin_exe = self._odin_binary(odin_folder)
 
         if not os.path.exists(odin_exe):
-            self.build_info['update_error'] = f"✗ ERROR: odin.exe not found at {odin_exe}"
+            self.build_info['update_error'] = f"✗ ERROR: {self.builder.odin_binary_name} not found at {odin_exe}"
             self._log(self.build_info['update_error'])
             return False
         
@@ -467,7 +3706,7 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
                 [odin_exe, "version"],
                 capture_output=True,
                 text=True,
-                shell=True,
+                shell=USE_SHELL,
                 timeout=10
             )
 
@@ -475,14 +3714,16 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
                 version = result.stdout.strip()
                 self._log(f"✓ Built Odin executable works: {version}")
                 self.build_info['odin_build_version'] = version
+                if self.fingerprints and self._get_head_commit(odin_folder):
+                    self.fingerprints.record_compiler(self._get_head_commit(odin_folder), version)
                 
                 # Check if it's in PATH
                 if self._check_odin_available():
                     self._log("✓ Odin is also available in system PATH")
                 else:
                     self._log("⚠ Odin built successfully but not in system PATH")
-                    self._log(f"  Consider adding {odin_folder} to your PATH environment variable")
-                    self.build_info['odin_verify_msg'] = f"Odin built successfully but not in system PATH.\nConsider adding {odin_folder} to your PATH environment variable."
+                    self._log(f"  Consider adding {self.git_odin_folder} to your PATH environment variable")
+                    self.build_info['odin_verify_msg'] = f"Odin built successfully but not in system PATH.\nConsider adding {self.git_odin_folder} to your PATH environment variable."
 
                 return True
             else:
@@ -515,6 +3756,58 @@ class OdinUpdaterCommand(sublime_plugin.ApplicationCommand):
             self._log(f"Error checking package installation: {str(e)}")
             return False         
 
+ODIN_TIMING_PATTERN = re.compile(r'^\s*([A-Za-z][^\n]*?)\s+-\s+([0-9.]+)\s*(us|ms|s)\s+-\s+[0-9.]+\s*%', re.MULTILINE)
+ODIN_OPTIMIZATION_MODES = ('none', 'minimal', 'size', 'speed', 'aggressive')
+
+def parse_show_timings(output):
+    """Phases from `odin build -show-timings` output as (name, milliseconds), in the order they ran"""
+    scale = {'us': 0.001, 'ms': 1.0, 's': 1000.0}
+    phases = []
+    for name, value, unit in ODIN_TIMING_PATTERN.findall(output):
+        phases.append((name.strip(), float(value) * scale[unit]))
+    return phases
+
+def build_timings_path(project_path):
+    """History file of profiled builds for one project"""
+    project_path = os.path.abspath(project_path)
+    name = os.path.basename(project_path) or "project"
+    digest = hashlib.sha1(project_path.encode('utf-8')).hexdigest()[:10]
+    os.makedirs(get_data_path('build_timings'), exist_ok=True)
+    return get_data_path('build_timings', f"{name}-{digest}.jsonl")
+
+def format_build_timings(runs, window_size=20):
+    """Latest profiled build next to the median of the earlier ones, the slowest phases and the trend of the total"""
+    latest = runs[-1]
+    previous = runs[-window_size - 1:-1]
+    started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(latest['started']))
+    lines = [
+        f"Profiled build: {latest['project']}",
+        f"{started}, exit code {latest['exit_code']}, {' '.join(latest['options']) or 'default options'}",
+        f"Compared to the median of the previous {len(previous)} builds",
+        "",
+        f"{'phase':<28}{'latest':>12}{'median':>12}{'change':>12}",
+    ]
+    for name, duration in latest['phases']:
+        previous_median = median([dict(run['phases'])[name] for run in previous if name in dict(run['phases'])])
+        if previous_median is None:
+            lines.append(f"{name:<28}{duration:>9.0f} ms{'-':>12}{'-':>12}")
+        else:
+            lines.append(f"{name:<28}{duration:>9.0f} ms{previous_median:>9.0f} ms{duration - previous_median:>+9.0f} ms")
+    
+    # Total Time is reported by the compiler itself, the slowest phases are the ones below it
+    phases = [(name, duration) for name, duration in latest['phases'] if name != "Total Time"]
+    total = dict(latest['phases']).get("Total Time") or sum(duration for _, duration in phases) or 1
+    lines += ["", "Slowest phases", ""]
+    for name, duration in sorted(phases, key=lambda phase: phase[1], reverse=True)[:3]:
+        lines.append(f"{name:<28}{duration:>9.0f} ms{duration / total * 100:>10.1f}%")
+    
+    lines += ["", f"Total time of the last {min(len(runs), 10)} builds, oldest first", ""]
+    totals = [(run['started'], dict(run['phases']).get("Total Time", 0)) for run in runs[-10:]]
+    longest = max(run_total for _, run_total in totals) or 1
+    for run_started, run_total in totals:
+        lines.append(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(run_started))}{run_total:>9.0f} ms  {'#' * int(run_total / longest * 40)}")
+    return lines
+
 class AddOdinBuildSystemCommand(sublime_plugin.WindowCommand):
     def run(self):
         project_data = self.window.project_data()
@@ -522,28 +3815,65 @@ class AddOdinBuildSystemCommand(sublime_plugin.WindowCommand):
             sublime.error_message("No project file found. Please save your project first.")
             return
 
-        # modified version of Karl Zylinski's tutorial build system
-        build_system_name = "sublime_odin_template"
-        build_system = {
-            "selector": "source.odin",
-            "name": build_system_name,
-            "working_dir": "$project_path",
-            "file_regex": "^(.+)\\(([0-9]+):([0-9]+)\\) (.+)$",
-            "shell": True,
-            "variants": [
+        # Optimization mode and thread count from the settings are added to every variant
+        options = []
+        optimization = odin_settings.get('build_optimization', '')
+        if optimization in ODIN_OPTIMIZATION_MODES:
+            options.append(f"-o:{optimization}")
+        elif optimization:
+            sublime.status_message(f"Unknown build_optimization '{optimization}', expected one of {', '.join(ODIN_OPTIMIZATION_MODES)}")
+        if odin_settings.get('build_thread_count', 0):
+            options.append(f"-thread-count:{odin_settings.get('build_thread_count', 0)}")
+        
+        build_cmd = ["odin", "build", ".", "-out:${project_base_name}.exe", "-vet-semicolon"] + options
+        if sublime.platform() == 'windows':
+            variants = [
                 {
                     "name": "Build and Run (temporary exe)", 
-                    "cmd": ["odin", "run", ".", "-out:${project_base_name}.exe", "-vet-semicolon"]
+                    "cmd": ["odin", "run", ".", "-out:${project_base_name}.exe", "-vet-semicolon"] + options
+                },
+                {
+                    "name": "Build and Run",
+                    "cmd": build_cmd + ["&&", "${project_base_name}.exe"]
+                },
+                {
+                    "name": "Build Only",
+                    "cmd": build_cmd
+                }
+            ]
+        else:
+            # A cmd list is not run through the shell on Linux/macOS, && needs a shell_cmd
+            build_cmd = ["odin", "build", ".", "-out:${project_base_name}", "-vet-semicolon"] + options
+            variants = [
+                {
+                    "name": "Build and Run (temporary exe)",
+                    "cmd": ["odin", "run", ".", "-out:${project_base_name}", "-vet-semicolon"] + options
                 },
                 {
                     "name": "Build and Run",
-                    "cmd": ["odin", "build", ".", "-out:${project_base_name}.exe", "-vet-semicolon", "&&", "${project_base_name}.exe"]
+                    "shell_cmd": " ".join(build_cmd) + " && ./${project_base_name}"
                 },
                 {
                     "name": "Build Only",
-                    "cmd": ["odin", "build", ".", "-out:${project_base_name}.exe", "-vet-semicolon"]
+                    "cmd": build_cmd
                 }
             ]
+        variants.append({
+            "name": "Build (profiled)",
+            "target": "odin_profiled_build",
+            "cancel": {"kill": True},
+            "cmd": build_cmd + ["-show-timings"]
+        })
+
+        # modified version of Karl Zylinski's tutorial build system
+        build_system_name = "sublime_odin_template"
+        build_system = {
+            "selector": "source.odin",
+            "name": build_system_name,
+            "working_dir": "$project_path",
+            "file_regex": "^(.+)\\(([0-9]+):([0-9]+)\\) (.+)$",
+            "shell": sublime.platform() == 'windows',
+            "variants": variants
         }
         
         if "build_systems" not in project_data:
@@ -556,7 +3886,15 @@ class AddOdinBuildSystemCommand(sublime_plugin.WindowCommand):
                 break
 
         if existing_index is not None:
-            sublime.message_dialog("Odin build system already exists in project")
+            # An existing build system may be edited by hand, only the profiled variant is added to it
+            existing = project_data["build_systems"][existing_index]
+            existing_variants = existing.setdefault("variants", [])
+            if any(variant.get("target") == "odin_profiled_build" for variant in existing_variants):
+                sublime.message_dialog("Odin build system already exists in project")
+            else:
+                sublime.message_dialog("\"Build (profiled)\" variant added to the Odin build system in project")
+                existing_variants.append(variants[-1])
+                self.window.set_project_data(project_data)
         else:
             sublime.message_dialog("Odin build system added to project")
             project_data["build_systems"].append(build_system)
@@ -566,27 +3904,126 @@ class AddOdinBuildSystemCommand(sublime_plugin.WindowCommand):
         if project_file:
             self.window.open_file(project_file)
 
-class AddOdinFoldersToProjectCommand(sublime_plugin.WindowCommand):
-    def get_setting(self, key, default=None):
-        settings = sublime.load_settings('OdinUpdater.sublime-settings')
-        os_specific_settings = {}
-        if sublime.platform() == 'windows':
-            os_specific_settings = sublime.load_settings('OdinUpdater (Windows).sublime-settings')
-        elif sublime.platform() == 'osx':
-            os_specific_settings = sublime.load_settings('OdinUpdater (OSX).sublime-settings')
-        else:
-            os_specific_settings = sublime.load_settings('OdinUpdater (Linux).sublime-settings')
-        return os_specific_settings.get(key, settings.get(key, default))
+class OdinProfiledBuildCommand(sublime_plugin.WindowCommand):
+    """Build target for the "Build (profiled)" variant, records the -show-timings phases per project"""
+    PANEL_NAME = "odin_profiled_build"
+    process = None
+    
+    def run(self, cmd=None, working_dir=None, file_regex="", kill=False, **kwargs):
+        if kill:
+            if OdinProfiledBuildCommand.process:
+                kill_process_tree(OdinProfiledBuildCommand.process)
+                sublime.status_message("Profiled build cancelled")
+            return
+        if OdinProfiledBuildCommand.process and OdinProfiledBuildCommand.process.poll() is None:
+            sublime.status_message("A profiled build is already running")
+            return
         
-    def run(self):
-        odin_root = self.get_setting('odin_folder', '')
-        folder_paths = [
-            odin_root + "\\base",
-            odin_root + "\\core",
-            odin_root + "\\examples",
-            odin_root + "\\vendor",
-        ]
+        working_dir = working_dir or os.path.dirname(self.window.project_file_name() or "")
+        self.panel = self.window.create_output_panel(self.PANEL_NAME)
+        self.panel.settings().set("result_file_regex", file_regex)
+        self.panel.settings().set("result_base_dir", working_dir)
+        self.panel.settings().set("word_wrap", False)
+        self.window.run_command("show_panel", {"panel": f"output.{self.PANEL_NAME}"})
+        threading.Thread(target=self._build, args=(cmd, working_dir)).start()
+    
+    def _append(self, text):
+        self.panel.run_command("append", {"characters": text, "force": True, "scroll_to_end": True})
+    
+    def _build(self, cmd, working_dir):
+        self._append(f"Running {' '.join(cmd)} in {working_dir}\n\n")
+        started = time.time()
+        try:
+            process = subprocess.Popen(cmd, cwd=working_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=USE_SHELL, **new_process_group())
+        except OSError as e:
+            return self._append(f"Could not start the build: {str(e)}\n")
+        
+        OdinProfiledBuildCommand.process = process
+        lines = []
+        try:
+            for line in iter(process.stdout.readline, b''):
+                line = line.decode('utf-8', errors='replace').replace('\r\n', '\n')
+                lines.append(line)
+                self._append(line)
+            exit_code = process.wait()
+        finally:
+            OdinProfiledBuildCommand.process = None
+        output = "".join(lines)
+        
+        phases = parse_show_timings(output)
+        if not phases:
+            return self._append(f"\n[exit code {exit_code}, no -show-timings output found]\n")
+        
+        history_path = build_timings_path(working_dir)
+        append_update_history(history_path, {
+            'started': started,
+            'project': working_dir,
+            'exit_code': exit_code,
+            'options': [arg for arg in cmd if arg.startswith(("-o:", "-thread-count:"))],
+            'phases': phases,
+        })
+        self._append("\n" + "\n".join(format_build_timings(load_update_history(history_path))) + "\n")
+
+class ShowOdinBuildTimingsCommand(sublime_plugin.WindowCommand):
+    """History of the profiled builds of the current project"""
+    def run(self, window_size=20):
+        project_file = self.window.project_file_name()
+        if not project_file:
+            return sublime.error_message("No project file found. Please save your project first.")
+        
+        runs = load_update_history(build_timings_path(os.path.dirname(project_file)))
+        if not runs:
+            return sublime.message_dialog("No profiled builds recorded for this project yet. Use the \"Build (profiled)\" variant of the Odin build system.")
+        
+        view = self.window.new_file()
+        view.set_name("Odin Build Timings")
+        view.set_scratch(True)
+        view.run_command("append", {"characters": "\n".join(format_build_timings(runs, window_size)) + "\n"})
+        view.set_read_only(True)
+
+# Files in the Odin folders that are never useful in Goto Anything or Find in Files
+ODIN_BINARY_EXTENSIONS = (
+    '.lib', '.dll', '.a', '.so', '.dylib', '.exe', '.pdb', '.exp', '.ilk', '.obj', '.o', '.wasm', '.bin', '.dat', '.zip',
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tga', '.ico', '.qoi', '.hdr', '.ttf', '.otf', '.wav', '.ogg', '.mp3', '.spv',
+)
+ODIN_IMPORT_PATTERN = re.compile(r'^\s*import\s+(?:\w+\s+)?"(base|core|vendor):([^"]+)"', re.MULTILINE)
+
+def scan_odin_tree(folder):
+    """
+    Index exclusions for one Odin folder so only .odin sources are indexed and searched:
+    folders without any .odin file below them, binaries/assets (hidden) and other files (not searched)
+    """
+    folders_with_odin = set()
+    folders_without_odin = set()
+    excluded_files = set()
+    binary_files = set()
+    for root, dirs, names in os.walk(folder, topdown=False):
+        has_odin = any(name.endswith(".odin") for name in names) or any(os.path.join(root, d) in folders_with_odin for d in dirs)
+        if has_odin:
+            folders_with_odin.add(root)
+        elif root != folder:
+            folders_without_odin.add(root)
+        for name in names:
+            extension = os.path.splitext(name)[1].lower()
+            if not extension or extension == ".odin":
+                continue
+            if extension in ODIN_BINARY_EXTENSIONS:
+                excluded_files.add(f"*{extension}")
+            else:
+                binary_files.add(f"*{extension}")
+    
+    # Folder patterns match names, a name that also holds .odin files somewhere can't be excluded
+    names_with_odin = set(os.path.basename(path) for path in folders_with_odin)
+    return {
+        'folder_exclude_patterns': sorted(set(os.path.basename(path) for path in folders_without_odin) - names_with_odin),
+        'file_exclude_patterns': sorted(excluded_files),
+        'binary_file_patterns': sorted(binary_files),
+    }
 
+class AddOdinFoldersToProjectCommand(sublime_plugin.WindowCommand):
+    def run(self, imported_only=False):
+        odin_root = odin_settings.get('odin_folder', '')
+        
         project_data = self.window.project_data()
         if not project_data:
             project_data = {}
@@ -594,19 +4031,431 @@ class AddOdinFoldersToProjectCommand(sublime_plugin.WindowCommand):
         if "folders" not in project_data:
             project_data["folders"] = []
         
-        existing_paths = [os.path.abspath(f["path"]) for f in project_data["folders"]]
+        if imported_only:
+            folders = self._imported_package_folders(odin_root, project_data)
+        else:
+            folders = [{"path": os.path.join(odin_root, name)} for name in ("base", "core", "examples", "vendor")]
+        
+        scans = self._load_scans(odin_root) if odin_settings.get('project_index_exclusions', True) else {}
+        existing = dict((self._project_path(f["path"]), f) for f in project_data["folders"])
         added_count = 0
+        updated_count = 0
         
-        for folder_path in folder_paths:
-            if os.path.exists(folder_path):
-                abs_path = os.path.abspath(folder_path)
-                if abs_path not in existing_paths:
-                    project_data["folders"].append({"path": folder_path})
-                    added_count += 1
-                    existing_paths.append(abs_path)  # Prevent duplicates in same operation
+        for folder in folders:
+            folder_path = folder["path"]
+            if not os.path.exists(folder_path):
+                continue
+            
+            abs_path = os.path.abspath(folder_path)
+            scan = scans.get(abs_path)
+            if scan is None and imported_only:
+                # Package folders use the file patterns of their collection
+                collection_scan = scans.get(os.path.abspath(os.path.join(odin_root, folder["name"].split(':')[0]))) or {}
+                scan = dict((key, collection_scan[key]) for key in ('file_exclude_patterns', 'binary_file_patterns') if key in collection_scan)
+            if scan:
+                folder.update(scan)
+            
+            if abs_path not in existing:
+                project_data["folders"].append(folder)
+                added_count += 1
+                existing[abs_path] = folder  # Prevent duplicates in same operation
+            elif scan:
+                # Patterns the user set on the folder are kept, the scanned ones are added to them
+                entry = existing[abs_path]
+                changed = False
+                for key, patterns in scan.items():
+                    current = entry.get(key, [])
+                    missing = [pattern for pattern in patterns if pattern not in current]
+                    if missing:
+                        entry[key] = current + missing
+                        changed = True
+                if changed:
+                    updated_count += 1
         
-        if added_count > 0:
+        if added_count > 0 or updated_count > 0:
             self.window.set_project_data(project_data)
-            sublime.status_message(f"Added {added_count} folders to project")
+            sublime.status_message(f"Added {added_count} folders to project" + (f", updated exclusions of {updated_count}" if updated_count else ""))
         else:
             sublime.status_message("No new folders to add (already exist or paths not found)")
+    
+    def _imported_package_folders(self, odin_root, project_data):
+        """Folders of the base/core/vendor packages imported by the .odin files of the project"""
+        odin_root_abs = os.path.abspath(odin_root)
+        packages = set()
+        for project_folder in project_data["folders"]:
+            project_path = self._project_path(project_folder["path"])
+            if project_path == odin_root_abs or project_path.startswith(odin_root_abs + os.sep):
+                continue
+            for root, dirs, names in os.walk(project_path):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                for name in names:
+                    if name.endswith(".odin"):
+                        with open(os.path.join(root, name), 'r', encoding='utf-8', errors='replace') as f:
+                            packages.update(ODIN_IMPORT_PATTERN.findall(f.read()))
+        
+        folders = []
+        for collection, package in sorted(packages):
+            folder_path = os.path.join(odin_root, collection, *package.split('/'))
+            # Subpackages are only added when they are imported themselves
+            subfolders = [name for name in sorted(os.listdir(folder_path)) if os.path.isdir(os.path.join(folder_path, name))] if os.path.isdir(folder_path) else []
+            folders.append({"path": folder_path, "name": f"{collection}:{package}", "folder_exclude_patterns": subfolders})
+        return folders
+    
+    def _project_path(self, path):
+        """Folder paths in a project are relative to the .sublime-project file, not to the working directory"""
+        project_file = self.window.project_file_name()
+        if project_file and not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(project_file), path)
+        return os.path.abspath(path)
+    
+    def _load_scans(self, odin_root):
+        """Exclusions for each Odin folder, the scan is cached per installed tag/commit"""
+        installed = BuildFingerprintStore(get_data_path('build_fingerprints.json')).get('odin') or {}
+        key = f"{os.path.abspath(odin_root)}|{installed.get('tag')}|{installed.get('commit')}"
+        cache_path = get_data_path('folder_scans.json')
+        try:
+            with open(cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        
+        if installed.get('commit') and key in cache:
+            return cache[key]
+        
+        scans = {}
+        for name in ("base", "core", "examples", "vendor"):
+            folder = os.path.join(odin_root, name)
+            if os.path.isdir(folder):
+                scans[os.path.abspath(folder)] = scan_odin_tree(folder)
+        
+        # Only the current installation is kept
+        with open(cache_path, 'w') as f:
+            json.dump({key: scans}, f, indent=4)
+        return scans
+
+class SwitchOdinBuildCommand(sublime_plugin.WindowCommand):
+    """Make any cached Odin or OLS build the active one, without compiling"""
+    def run(self):
+        self.store = open_artifact_store()
+        if self.store is None:
+            sublime.message_dialog("Build caching is turned off (artifact_cache_max_count is 0).")
+            return
+        self.entries = self.store.entries()
+        if not self.entries:
+            sublime.message_dialog("No cached builds found. Builds are cached after each successful update.")
+            return
+        
+        fingerprints = BuildFingerprintStore(get_data_path('build_fingerprints.json'))
+        items = []
+        for entry in self.entries:
+            active = fingerprints.get(entry['component'])
+            is_active = active is not None and active.get('binary_hash') == entry['blob']
+            title = f"{entry['component'].upper()} {entry['tag'] or ''} {entry['commit'][:10]}{' (active)' if is_active else ''}"
+            built = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry['created']))
+            items.append([title, f"Built {built}, {entry['size'] // 1024} KB, toolchain: {entry['toolchain'] or 'default'}"])
+        
+        self.window.show_quick_panel(items, self.on_done)
+    
+    def on_done(self, index):
+        if index < 0:
+            return
+        # Switching checks out sources and replaces binaries, it can't overlap with an update
+        if not update_coordinator.begin(self):
+            return sublime.message_dialog(f"{update_coordinator.task} is running, switch builds after it has finished.")
+        threading.Thread(target=self._switch, args=(self.entries[index],)).start()
+    
+    def _switch(self, entry):
+        try:
+            component = entry['component']
+            folder = odin_settings.get('odin_folder' if component == 'odin' else 'ols_folder', '')
+            
+            if component == 'odin':
+                # The compiler has to match its base/core/vendor sources, this is a local checkout only
+                if subprocess.run(["git", "checkout", entry['commit']], cwd=folder, shell=USE_SHELL).returncode != 0:
+                    if not entry['tag']:
+                        return sublime.error_message(f"Could not check out Odin commit {entry['commit']}")
+                    refspec = f"+refs/tags/{entry['tag']}:refs/tags/{entry['tag']}"
+                    subprocess.run(["git", "fetch", "--no-tags", "origin", refspec], cwd=folder, shell=USE_SHELL)
+                    if subprocess.run(["git", "checkout", entry['tag']], cwd=folder, shell=USE_SHELL).returncode != 0:
+                        return sublime.error_message(f"Could not check out Odin {entry['tag']}")
+            else:
+                sublime.run_command("lsp_disable_language_server_globally")
+            
+            self.store.activate(entry, os.path.join(folder, entry['binary_name']))
+            BuildFingerprintStore(get_data_path('build_fingerprints.json')).set(component, {
+                'commit': entry['commit'],
+                'tag': entry['tag'],
+                'compiler': entry['toolchain'],
+                'binary_hash': entry['blob'],
+            })
+            
+            if component == 'ols':
+                sublime.run_command("lsp_enable_language_server_globally")
+            
+            sublime.message_dialog(f"Switched {component.upper()} to {entry['tag'] or ''} {entry['commit'][:10]}")
+        
+        except Exception as e:
+            sublime.error_message(f"Switching build failed: {str(e)}")
+        
+        finally:
+            update_coordinator.end()
+
+class ExportOdinBundleCommand(sublime_plugin.WindowCommand):
+    """Pack the installed, verified Odin (and OLS) build into a bundle other machines can install"""
+    def run(self, folder=None):
+        if folder:
+            return self.on_done(folder)
+        default_folder = odin_settings.get('bundle_folder', '') or get_data_path('bundles')
+        self.window.show_input_panel("Export Odin bundle to folder:", default_folder, self.on_done, None, None)
+    
+    def on_done(self, folder):
+        # The bundle has to be taken from a consistent installation, not one that is being updated
+        if not update_coordinator.begin(self):
+            return sublime.message_dialog(f"{update_coordinator.task} is running, export the bundle after it has finished.")
+        threading.Thread(target=self._export, args=(normalize_path(folder),)).start()
+    
+    def _export(self, folder):
+        try:
+            builder = create_builder(sublime.platform())
+            fingerprints = BuildFingerprintStore(get_data_path('build_fingerprints.json'))
+            build_info = load_build_info()
+            
+            components = {}
+            odin_folder = odin_settings.get('odin_folder', '')
+            odin = self._verified_component(fingerprints, 'odin', odin_folder, builder.odin_binary_name)
+            if not odin or not build_info:
+                return sublime.error_message("No verified Odin build found, run Update Odin Compiler and OLS first.")
+            odin['files'] = bundle_files(odin_folder, (builder.odin_binary_name,) + builder.odin_runtime_files, ODIN_BUNDLE_FOLDERS)
+            components['odin'] = odin
+            
+            if odin_settings.get('update_ols', True):
+                ols_folder = odin_settings.get('ols_folder', '')
+                ols = self._verified_component(fingerprints, 'ols', ols_folder, builder.ols_binary_name)
+                if ols:
+                    ols['files'] = bundle_files(ols_folder, (builder.ols_binary_name,), OLS_BUNDLE_FOLDERS)
+                    components['ols'] = ols
+            
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"odin-{odin['tag'] or 'build'}-{odin['commit'][:7]}-{bundle_platform()}.zip")
+            sublime.status_message(f"Exporting Odin bundle to {path}...")
+            ToolchainBundle(path).write(build_info, components)
+            sublime.message_dialog(f"Exported {' and '.join(c.upper() for c in components)} to\n\n{path}")
+        
+        except (OSError, zipfile.BadZipFile) as e:
+            sublime.error_message(f"Exporting bundle failed: {str(e)}")
+        
+        finally:
+            update_coordinator.end()
+    
+    def _verified_component(self, fingerprints, component, folder, binary_name):
+        """Only builds with a fingerprint that matches the binary on disk are exported"""
+        fingerprint = fingerprints.get(component)
+        if not fingerprint or fingerprint.get('binary_hash') != file_sha256(os.path.join(folder, binary_name)):
+            return None
+        return {
+            'commit': fingerprint['commit'],
+            'tag': fingerprint.get('tag'),
+            'compiler': fingerprint.get('compiler'),
+            'folder': folder,
+            'binary_name': binary_name,
+        }
+
+class InstallOdinBundleCommand(sublime_plugin.WindowCommand):
+    """Install Odin (and OLS) from a bundle made with Export Odin Bundle, no git or compiler needed"""
+    def run(self, path=None):
+        if path:
+            return self.on_path(path)
+        
+        self.bundles = []
+        for folder in (odin_settings.get('bundle_folder', ''), get_data_path('bundles')):
+            if not folder or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith(".zip"):
+                    continue
+                try:
+                    manifest = ToolchainBundle(os.path.join(folder, name)).read_manifest()
+                except (BundleError, OSError, ValueError, zipfile.BadZipFile):
+                    continue
+                if manifest.get('platform') == bundle_platform():
+                    self.bundles.append((os.path.join(folder, name), manifest))
+        
+        self.bundles.sort(key=lambda bundle: bundle[1]['created'], reverse=True)
+        items = []
+        for path, manifest in self.bundles:
+            odin = manifest['components']['odin']
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(manifest['created']))
+            items.append([f"Odin {odin['tag'] or ''} {odin['commit'][:10]}{' + OLS' if 'ols' in manifest['components'] else ''}", f"{created}  {path}"])
+        items.append(["Install bundle from path...", "Pick a bundle file that is not in bundle_folder"])
+        self.window.show_quick_panel(items, self.on_done)
+    
+    def on_done(self, index):
+        if index < 0:
+            return
+        if index == len(self.bundles):
+            return self.window.show_input_panel("Odin bundle path:", "", self.on_path, None, None)
+        self.on_path(self.bundles[index][0])
+    
+    def on_path(self, path):
+        if not update_coordinator.begin(self):
+            return sublime.message_dialog(f"{update_coordinator.task} is running, install the bundle after it has finished.")
+        threading.Thread(target=self._install, args=(normalize_path(path),)).start()
+    
+    def _install(self, path):
+        try:
+            bundle = ToolchainBundle(path)
+            manifest = bundle.read_manifest()
+            if manifest['platform'] != bundle_platform():
+                return sublime.error_message(f"The bundle was built for {manifest['platform']}, this machine is {bundle_platform()}.")
+            
+            targets = []
+            for component, folder_setting in (('odin', 'odin_folder'), ('ols', 'ols_folder')):
+                info = manifest['components'].get(component)
+                if not info or (component == 'ols' and not odin_settings.get('update_ols', True)):
+                    continue
+                folder = odin_settings.get(folder_setting, '')
+                ToolchainBundle.check_target(folder)
+                targets.append((component, info, folder))
+            
+            fingerprints = BuildFingerprintStore(get_data_path('build_fingerprints.json'))
+            installed = []
+            for component, info, folder in targets:
+                sublime.status_message(f"Installing {component.upper()} from bundle...")
+                if component == 'ols':
+                    sublime.run_command("lsp_disable_language_server_globally")
+                try:
+                    bundle.install(component, folder)
+                finally:
+                    if component == 'ols':
+                        sublime.run_command("lsp_enable_language_server_globally")
+                
+                # Updates from source skip the build when they reach the same commit
+                fingerprints.set(component, {
+                    'commit': info['commit'],
+                    'tag': info['tag'],
+                    'compiler': info['compiler'],
+                    'binary_hash': info['binary_hash'],
+                })
+                installed.append(f"{component.upper()} {info['tag'] or ''} {info['commit'][:10]} -> {folder}")
+            
+            save_build_info(manifest['build_info'])
+            sublime.message_dialog("Installed from bundle\n\n" + "\n".join(installed))
+        
+        except (BundleError, OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+            sublime.error_message(f"Installing bundle failed: {str(e)}")
+        
+        finally:
+            update_coordinator.end()
+
+class GotoOdinSymbolCommand(sublime_plugin.WindowCommand):
+    """Quick panel over the symbol index of the installed Odin packages, no project folders needed"""
+    def run(self):
+        threading.Thread(target=self._load).start()
+    
+    def _load(self):
+        odin_root = odin_settings.get('odin_folder', '')
+        index = OdinSymbolIndex(get_data_path('symbol_index.json.z'))
+        if index.load()['root'] != os.path.normpath(odin_root):
+            if not os.path.isdir(odin_root):
+                return sublime.message_dialog(f"Odin is not installed in {odin_root}, run Update Odin Compiler and OLS first.")
+            sublime.status_message("Indexing Odin packages...")
+            try:
+                index.refresh(odin_root)
+            except OSError as e:
+                return sublime.error_message(f"Indexing Odin packages failed: {str(e)}")
+        
+        self.odin_root = odin_root
+        self.symbols = sorted(index.symbols(), key=lambda symbol: (symbol[0].lower(), symbol[2]))
+        items = [[f"{name}  ({package})", f"{kind}: {signature}"] for name, kind, package, _, _, signature in self.symbols]
+        sublime.set_timeout(lambda: self.window.show_quick_panel(items, self.on_done, 0, 0, self.on_highlight), 0)
+    
+    def _open(self, index, flags):
+        _, _, _, rel_path, line, _ = self.symbols[index]
+        path = os.path.join(self.odin_root, *rel_path.split('/'))
+        self.window.open_file(f"{path}:{line}", sublime.ENCODED_POSITION | flags)
+    
+    def on_highlight(self, index):
+        if index >= 0:
+            self._open(index, sublime.TRANSIENT)
+    
+    def on_done(self, index):
+        if index >= 0:
+            self._open(index, 0)
+
+class CancelOdinUpdateCommand(sublime_plugin.ApplicationCommand):
+    """Stop the running update, its git or build process tree is killed and remaining stages are skipped"""
+    def run(self):
+        if update_coordinator.cancel():
+            sublime.status_message("Cancelling Odin update...")
+        else:
+            sublime.status_message("No Odin update is running")
+    
+    def is_enabled(self):
+        return update_coordinator.job is not None
+
+class ShowOdinUpdateHistoryCommand(sublime_plugin.WindowCommand):
+    """Latest update run next to the rolling median of earlier runs, per phase"""
+    def run(self, window_size=20):
+        runs = load_update_history(get_data_path('update_history.jsonl'))
+        if not runs:
+            sublime.message_dialog("No update history recorded yet.")
+            return
+        
+        latest = runs[-1]
+        previous = runs[-window_size - 1:-1]
+        
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(latest['started']))
+        lines = [
+            f"Latest update: {started}, {latest['duration']:.1f}s, result: {latest['result']}",
+            f"Compared to the median of the previous {len(previous)} runs",
+            "",
+            f"{'phase':<16}{'latest':>10}{'median':>10}{'change':>10}",
+        ]
+        
+        phase_names = sorted(latest['phases'], key=lambda name: latest['phases'][name]['start'])
+        for name in phase_names:
+            duration = latest['phases'][name]['duration']
+            previous_median = median([run['phases'][name]['duration'] for run in previous if name in run['phases']])
+            if previous_median is None:
+                lines.append(f"{name:<16}{duration:>9.1f}s{'-':>10}{'-':>10}")
+            else:
+                lines.append(f"{name:<16}{duration:>9.1f}s{previous_median:>9.1f}s{duration - previous_median:>+9.1f}s")
+        
+        total_median = median([run['duration'] for run in previous])
+        if total_median is not None:
+            lines.append(f"{'total':<16}{latest['duration']:>9.1f}s{total_median:>9.1f}s{latest['duration'] - total_median:>+9.1f}s")
+        
+        lines += ["", "Slowest steps in the latest run", ""]
+        for step in sorted(latest['steps'], key=lambda step: step['duration'], reverse=True)[:10]:
+            lines.append(f"{step['duration']:>8.1f}s  exit {step['exit_code']}  {step['output_bytes'] // 1024:>6} KB  {step['description']}")
+        
+        view = self.window.new_file()
+        view.set_name("Odin Update History")
+        view.set_scratch(True)
+        view.run_command("append", {"characters": "\n".join(lines) + "\n"})
+        view.set_read_only(True)
+
+class ReprobeOdinToolchainCommand(sublime_plugin.WindowCommand):
+    """Forget the cached toolchain environment and run the setup script again, e.g. after installing a new MSVC"""
+    def run(self):
+        if update_coordinator.is_busy():
+            return sublime.status_message(f"{update_coordinator.task} is running, re-probe the toolchain once it is done")
+        threading.Thread(target=self._probe).start()
+    
+    def _probe(self):
+        toolchain = ToolchainEnvironment(get_data_path('toolchain_env.json'))
+        toolchain.invalidate()
+        script = resolve_toolchain_script(odin_settings.get('toolchain_setup_script'))
+        if not script:
+            return sublime.message_dialog("No toolchain setup script configured (or vcvars64.bat not found), the build scripts set up the toolchain themselves.\n\nSet `toolchain_setup_script` in the settings to cache a toolchain environment.")
+        
+        sublime.status_message(f"Probing toolchain: {script}")
+        try:
+            env = toolchain.probe(script, odin_settings.get('toolchain_setup_args', []))
+        except ToolchainError as error:
+            return sublime.error_message(str(error))
+        
+        builder = create_builder(sublime.platform())
+        path = next((value for key, value in env.items() if key.upper() == "PATH"), None)
+        compiler = shutil.which(builder.toolchain_compiler, path=path)
+        sublime.message_dialog(f"Toolchain environment cached\n\nScript: {script}\nVariables: {len(env)}\n{builder.toolchain_compiler}: {compiler or 'not found'}")
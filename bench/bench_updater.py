@@ -0,0 +1,422 @@
+"""
+Headless benchmark for the Odin Updater pipeline.
+
+Runs OdinUpdaterCommand end to end outside of Sublime Text, against local bare git repositories with
+generated history, dev-YYYY-MM tags and fake build scripts. No network or compiler is needed.
+
+Scenarios
+    cold      clone and build into empty folders
+    noop      update again without upstream changes
+    new_tag   update after a new dev tag was pushed upstream
+
+Usage
+    python bench/bench_updater.py [--commits 500] [--tags 24] [--build-seconds 0.5] [--fetch-mode full]
+                                  [--output results.json] [--compare previous.json] [--verbose]
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+
+PACKAGE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAKE_ODIN_BUILD = """#!/bin/sh
+echo "building odin ($1)"
+sleep {build_seconds}
+printf '#!/bin/sh\\necho "odin version dev"\\n' > odin
+chmod +x odin
+"""
+
+FAKE_OLS_BUILD = """#!/bin/sh
+echo "building ols $@"
+sleep {build_seconds}
+printf '#!/bin/sh\\necho ols\\n' > ols
+chmod +x ols
+"""
+
+# Stubs for the Sublime Text API ------------------------------------------------------------------
+
+class StubSettings(dict):
+    """Settings object that calls its change listeners like Sublime does"""
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.listeners = {}
+
+    def set(self, key, value):
+        self[key] = value
+        for callback in list(self.listeners.values()):
+            callback()
+
+    def add_on_change(self, tag, callback):
+        self.listeners[tag] = callback
+
+    def clear_on_change(self, tag):
+        self.listeners.pop(tag, None)
+
+    def to_dict(self):
+        return dict(self)
+
+class StubView:
+    def __init__(self):
+        self.text = ""
+
+    def settings(self):
+        return StubSettings()
+
+    def run_command(self, command, args=None):
+        if command == "append":
+            self.text += args["characters"]
+
+    def set_name(self, name):
+        pass
+
+    def set_scratch(self, scratch):
+        pass
+
+    def set_read_only(self, read_only):
+        pass
+
+class StubWindow:
+    def create_output_panel(self, name):
+        return StubView()
+
+    def new_file(self):
+        return StubView()
+
+    def views(self):
+        return []
+
+    def run_command(self, command, args=None):
+        pass
+
+    def project_data(self):
+        return {}
+
+    def set_project_data(self, data):
+        pass
+
+    def status_message(self, message):
+        pass
+
+class StubSublime(types.ModuleType):
+    """The parts of the sublime module used by the updater, dialogs are recorded instead of shown"""
+    def __init__(self, packages_path, settings):
+        super().__init__("sublime")
+        self.packages = packages_path
+        self.settings = settings
+        self.dialogs = []
+        self.window = StubWindow()
+        self.loaded_settings = {}
+
+    def load_settings(self, name):
+        # Sublime hands out the same object for every load, listeners included
+        if name not in self.loaded_settings:
+            self.loaded_settings[name] = StubSettings(self.settings.get(name, {}))
+        return self.loaded_settings[name]
+
+    def platform(self):
+        return {'Windows': 'windows', 'Darwin': 'osx'}.get(platform.system(), 'linux')
+
+    def packages_path(self):
+        return self.packages
+
+    def cache_path(self):
+        return os.path.join(self.packages, "..", "Cache")
+
+    def active_window(self):
+        return self.window
+
+    def windows(self):
+        return [self.window]
+
+    def message_dialog(self, message):
+        self.dialogs.append(('message', message))
+
+    def error_message(self, message):
+        self.dialogs.append(('error', message))
+
+    def ok_cancel_dialog(self, message, ok_title=""):
+        self.dialogs.append(('ok_cancel', message))
+        return False
+
+    def status_message(self, message):
+        pass
+
+    def run_command(self, command, args=None):
+        pass
+
+    def set_timeout(self, callback, delay=0):
+        callback()
+
+    def set_timeout_async(self, callback, delay=0):
+        callback()
+
+def install_stubs(packages_path, settings):
+    stub_sublime = StubSublime(packages_path, settings)
+
+    stub_plugin = types.ModuleType("sublime_plugin")
+    class Command:
+        def __init__(self, *args):
+            pass
+    stub_plugin.ApplicationCommand = Command
+    stub_plugin.WindowCommand = Command
+    stub_plugin.TextCommand = Command
+    stub_plugin.EventListener = Command
+
+    sys.modules["sublime"] = stub_sublime
+    sys.modules["sublime_plugin"] = stub_plugin
+    return stub_sublime
+
+def load_updater():
+    spec = importlib.util.spec_from_file_location("OdinUpdater", os.path.join(PACKAGE_FOLDER, "OdinUpdater.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+# Subprocess counting -----------------------------------------------------------------------------
+
+class SubprocessCounter:
+    """Counts every process started through subprocess (subprocess.run uses Popen too)"""
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+        self.original_popen = subprocess.Popen
+        counter = self
+
+        class CountingPopen(subprocess.Popen):
+            def __init__(self, *args, **kwargs):
+                with counter.lock:
+                    counter.count += 1
+                super().__init__(*args, **kwargs)
+
+        self.counting_popen = CountingPopen
+
+    def __enter__(self):
+        self.count = 0
+        subprocess.Popen = self.counting_popen
+        return self
+
+    def __exit__(self, *exc):
+        subprocess.Popen = self.original_popen
+
+# Generated upstream repositories -----------------------------------------------------------------
+
+def git(cwd, *args, stdin=None):
+    return subprocess.run(
+        ["git", "-c", "user.name=Bench", "-c", "user.email=bench@example.com"] + list(args),
+        cwd=cwd,
+        input=stdin,
+        capture_output=True,
+        check=True
+    )
+
+def data_block(content):
+    content = content.encode('utf-8')
+    return b"data %d\n" % len(content) + content + b"\n"
+
+def add_commits(bare_repo, first_index, count, files, tags=0, tag_offset=0, parent=None):
+    """
+    Append commits to master of a bare repository with git fast-import, much faster than one commit per process.
+
+    files are written with the first commit, every commit also changes src/generated.odin.
+    tags lightweight dev-YYYY-MM tags are spread evenly over the new commits, the last commit is always tagged.
+    """
+    stream = b""
+    mark = 1
+    timestamp = 1577836800 + first_index * 3600
+    tags_created = []
+    tags_every = max(1, count // tags) if tags else 0
+
+    for i in range(count):
+        index = first_index + i
+        stream += b"commit refs/heads/master\n"
+        stream += b"mark :%d\n" % mark
+        stream += b"committer Bench <bench@example.com> %d +0000\n" % (timestamp + i * 3600)
+        stream += data_block(f"Commit {index}")
+        if i == 0 and parent:
+            stream += f"from {parent}\n".encode('utf-8')
+        if i == 0:
+            for path, (content, executable) in files.items():
+                stream += f"M {'100755' if executable else '100644'} inline {path}\n".encode('utf-8')
+                stream += data_block(content)
+        stream += b"M 100644 inline src/generated.odin\n"
+        stream += data_block(f"package src\n\nvalue_{index} :: {index}\n")
+
+        commits_left = count - 1 - i
+        if tags_every and commits_left % tags_every == 0 and commits_left // tags_every < tags:
+            tag_index = tag_offset + len(tags_created)
+            tag = f"dev-{2020 + tag_index // 12}-{tag_index % 12 + 1:02d}"
+            stream += f"reset refs/tags/{tag}\nfrom :{mark}\n\n".encode('utf-8')
+            tags_created.append(tag)
+        mark += 1
+
+    git(bare_repo, "fast-import", "--quiet", stdin=stream)
+    return tags_created
+
+def create_upstream(folder, commits, tags, build_seconds):
+    odin_repo = os.path.join(folder, "odin.git")
+    ols_repo = os.path.join(folder, "ols.git")
+    for repo in (odin_repo, ols_repo):
+        os.makedirs(repo)
+        git(repo, "init", "--quiet", "--bare")
+        git(repo, "symbolic-ref", "HEAD", "refs/heads/master")
+
+    odin_files = {
+        "build_odin.sh": (FAKE_ODIN_BUILD.format(build_seconds=build_seconds), True),
+        "core/fmt/fmt.odin": ("package fmt\n\nprintln :: proc(args: ..any) {}\n", False),
+        "base/runtime/core.odin": ("package runtime\n\nType_Info :: struct {}\n", False),
+    }
+    ols_files = {
+        "build.sh": (FAKE_OLS_BUILD.format(build_seconds=build_seconds), True),
+        "src/main.odin": ("package main\n\nmain :: proc() {}\n", False),
+    }
+
+    created = add_commits(odin_repo, 0, commits, odin_files, tags=tags)
+    add_commits(ols_repo, 0, max(1, commits // 4), ols_files)
+    return odin_repo, ols_repo, len(created)
+
+# Benchmark ---------------------------------------------------------------------------------------
+
+def run_update(updater, stub_sublime, counter, verbose=False):
+    stub_sublime.dialogs.clear()
+    command = updater.OdinUpdaterCommand()
+
+    console = sys.stdout if verbose else io.StringIO()
+    start = time.perf_counter()
+    with counter, contextlib.redirect_stdout(console):
+        command.run()
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and not thread.daemon:
+                thread.join()
+    wall_time = time.perf_counter() - start
+
+    errors = [message for kind, message in stub_sublime.dialogs if kind == 'error']
+    if errors:
+        raise RuntimeError(f"Update failed: {errors[0]}")
+
+    phases = {}
+    if command.timings:
+        phases = {name: phase['duration'] for name, phase in command.timings.phases.items()}
+
+    return {
+        'wall_time': wall_time,
+        'subprocesses': counter.count,
+        'phases': phases,
+        'odin_tag': command.build_info['odin_tag'],
+    }
+
+def run_benchmark(args):
+    work_folder = tempfile.mkdtemp(prefix="updater-bench-")
+    try:
+        packages_path = os.path.join(work_folder, "Packages")
+        os.makedirs(os.path.join(packages_path, "User"))
+        with open(os.path.join(packages_path, "User", "OdinUpdater.sublime-settings"), 'w') as f:
+            f.write("{}")
+
+        upstream_folder = os.path.join(work_folder, "upstream")
+        odin_repo, ols_repo, tag_count = create_upstream(upstream_folder, args.commits, args.tags, args.build_seconds)
+
+        settings = {
+            "OdinUpdater.sublime-settings": {
+                "odin_repo_url": "file://" + odin_repo,
+                "ols_repo_url": "file://" + ols_repo,
+                "odin_folder": os.path.join(work_folder, "install", "odin"),
+                "ols_folder": os.path.join(work_folder, "install", "ols"),
+                "update_ols": True,
+                "git_fetch_mode": args.fetch_mode,
+                "git_mirror": args.mirror,
+                "git_mirror_folder": os.path.join(work_folder, "mirrors"),
+                # Background maintenance would run between the measured updates
+                "git_maintenance": False,
+            },
+            "Package Control.sublime-settings": {
+                "installed_packages": ["LSP", "Odin"],
+            },
+        }
+        stub_sublime = install_stubs(packages_path, settings)
+        updater = load_updater()
+        counter = SubprocessCounter()
+
+        results = {}
+        results['cold'] = run_update(updater, stub_sublime, counter, args.verbose)
+        results['noop'] = run_update(updater, stub_sublime, counter, args.verbose)
+
+        head = git(odin_repo, "rev-parse", "refs/heads/master").stdout.decode().strip()
+        add_commits(odin_repo, args.commits, 10, {}, tags=1, tag_offset=tag_count, parent=head)
+        results['new_tag'] = run_update(updater, stub_sublime, counter, args.verbose)
+
+        return {
+            'created': time.time(),
+            'config': {
+                'commits': args.commits,
+                'tags': args.tags,
+                'build_seconds': args.build_seconds,
+                'fetch_mode': args.fetch_mode,
+                'mirror': args.mirror,
+                'platform': platform.platform(),
+                'git': subprocess.run(["git", "--version"], capture_output=True, text=True).stdout.strip(),
+            },
+            'scenarios': results,
+        }
+    finally:
+        if args.keep:
+            print(f"Kept benchmark folder {work_folder}")
+        else:
+            shutil.rmtree(work_folder, ignore_errors=True)
+
+def print_report(result, previous=None):
+    print(f"Odin Updater benchmark ({result['config']['commits']} commits, {result['config']['tags']} tags, fetch mode {result['config']['fetch_mode']}{', mirror' if result['config'].get('mirror') else ''})")
+    for name, scenario in result['scenarios'].items():
+        line = f"\n{name:<10} {scenario['wall_time']:>7.2f}s  {scenario['subprocesses']:>4} subprocesses  ({scenario['odin_tag']})"
+        old = previous['scenarios'].get(name) if previous else None
+        if old:
+            line += f"  [{scenario['wall_time'] - old['wall_time']:+.2f}s, {scenario['subprocesses'] - old['subprocesses']:+d} subprocesses]"
+        print(line)
+
+        for phase, duration in sorted(scenario['phases'].items(), key=lambda item: -item[1]):
+            phase_line = f"    {phase:<16} {duration:>7.2f}s"
+            if old and phase in old['phases']:
+                phase_line += f"  [{duration - old['phases'][phase]:+.2f}s]"
+            print(phase_line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless benchmark for the Odin Updater pipeline")
+    parser.add_argument("--commits", type=int, default=500, help="number of commits in the generated Odin history")
+    parser.add_argument("--tags", type=int, default=24, help="number of dev-YYYY-MM tags in the generated Odin history")
+    parser.add_argument("--build-seconds", type=float, default=0.5, help="time each fake build script sleeps")
+    parser.add_argument("--fetch-mode", default="full", choices=["full", "blobless", "shallow"], help="git_fetch_mode setting")
+    parser.add_argument("--mirror", action="store_true", help="clone and fetch through a local bare mirror (git_mirror)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary repositories and install folders")
+    parser.add_argument("--verbose", action="store_true", help="show the updater log")
+    args = parser.parse_args()
+
+    if platform.system() == 'Windows':
+        sys.exit("The benchmark uses shell scripts as fake builds and needs Linux or macOS")
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)
+
+    result = run_benchmark(args)
+    print_report(result, previous)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=4)
+        print(f"\nResults written to {args.output}")
+
+if __name__ == '__main__':
+    main()